@@ -16,38 +16,54 @@ def load_database(file_path):
     print("Loaded database:", database)  # Debug: In dữ liệu đọc được
     return database
 
-# Thuật toán HOIM
+# Sinh ứng viên k+1: gom mọi ứng viên mức k theo (k-1)-tiền tố, mỗi HOI chỉ
+# ghép với các ứng viên cùng nhóm có mục cuối lớn hơn (thứ tự như vòng lặp cũ).
+# IO giảm khi thêm mục nên tập có một k-tập con không phải HOI không thể là
+# HOI, kể cả các tập mở rộng của nó; các ứng viên đó bị bỏ trước khi giao tids.
+def join_candidates(level_HOI, candidates, k):
+    buckets = defaultdict(list)
+    for other, other_tids in candidates:
+        buckets[tuple(other[:k-1])].append((other[k-1], other_tids))
+    frequent = {tuple(itemset) for itemset, _ in level_HOI}
+    next_candidates = []
+    for itemset, tids in level_HOI:
+        for last, other_tids in buckets[tuple(itemset[:k-1])]:
+            if last > itemset[k-1]:
+                new_itemset = itemset + [last]
+                # Bỏ lần lượt từng mục trừ mục cuối (tập con đó chính là itemset)
+                if any(tuple(new_itemset[:i] + new_itemset[i+1:]) not in frequent for i in range(k)):
+                    continue
+                next_candidates.append((new_itemset, tids & other_tids))
+    return next_candidates
+
+# Thuật toán HOIM. Mỗi ứng viên mang theo tập tid của nó: tids của tập k+1
+# là giao tids của hai tập k sinh ra nó, nên không phải quét lại CSDL.
+# IO được cộng theo tid tăng dần như khi quét nên giá trị không đổi.
 def HOIM(database, MinIO):
     if not database:
         print("Error: Database is empty!")
         return []
     
     HOI = []
-    # Tính tần suất cho 1-itemsets
-    item_support = defaultdict(list)
+    # Tập tid của từng mục (1-itemsets)
+    item_support = defaultdict(set)
     for tid, t in enumerate(database):
         for item in t:
-            item_support[item].append(tid)
+            item_support[item].add(tid)
     
     # Kiểm tra 1-itemsets
-    candidates = [[item] for item in item_support]
+    candidates = [([item], tids) for item, tids in item_support.items()]
     k = 1
     while candidates:
-        next_candidates = []
-        for itemset in candidates:
-            tids = [tid for tid, t in enumerate(database) if set(itemset).issubset(t)]
-            IO = sum(1 / len(database[tid]) for tid in tids)
+        level_HOI = []
+        for itemset, tids in candidates:
+            IO = sum(1 / len(database[tid]) for tid in sorted(tids))
             print(f"Itemset: {itemset}, IO: {IO:.3f}")  # Debug: In IO của mỗi tập mục
             if IO >= MinIO:
                 HOI.append((itemset, IO))
-                # Sinh k+1 itemsets
-                if k == 1:
-                    next_candidates.extend([[itemset[0], new_item] for new_item in item_support if new_item > itemset[0]])
-                else:
-                    for other in candidates:
-                        if other[:k-1] == itemset[:k-1] and other[k-1] > itemset[k-1]:
-                            next_candidates.append(itemset + [other[k-1]])
-        candidates = next_candidates
+                level_HOI.append((itemset, tids))
+        # Sinh k+1 itemsets từ các HOI của mức này
+        candidates = join_candidates(level_HOI, candidates, k)
         k += 1
     
     return HOI
@@ -17,41 +17,109 @@ def calculate_TO(database):
     total_items = sum(len(t) for t in database)
     return [len(t) / total_items for t in database]
 
-# Tính Itemset Occupancy (IO) và IOUB
-def calculate_IO_IOUB(itemset, database, TO):
-    tids = [tid for tid, t in enumerate(database) if set(itemset).issubset(t)]
-    IO = sum(TO[tid] for tid in tids)
-    IOUB = sum(TO[tid] for tid, t in enumerate(database) if any(item in t for item in itemset))
+# Tính Itemset Occupancy (IO) và IOUB từ tập tid: tids là tập tid của itemset
+# (giao của hai tập sinh ra nó), IOUB lấy trên hợp tập tid của các mục.
+# Cộng theo tid tăng dần như khi quét CSDL nên giá trị không đổi.
+def calculate_IO_IOUB(itemset, tids, item_support, TO):
+    IO = sum(TO[tid] for tid in sorted(tids))
+    IOUB = sum(TO[tid] for tid in sorted(set().union(*(item_support[item] for item in itemset))))
     return IO, IOUB, tids
 
-# Thuật toán HOIMTO
-def HOIMTO(database, MinIO):
+# Sinh ứng viên k+1: gom mọi ứng viên mức k theo (k-1)-tiền tố, mỗi HOI chỉ
+# ghép với các ứng viên cùng nhóm có mục cuối lớn hơn (thứ tự như vòng lặp cũ).
+# Với backend="sparse" ứng viên không mang tids (None).
+# IO giảm khi thêm mục nên tập có một k-tập con không phải HOI không thể là
+# HOI, kể cả các tập mở rộng của nó; các ứng viên đó bị bỏ trước khi giao tids.
+def join_candidates(level_HOI, candidates, k):
+    buckets = defaultdict(list)
+    for other, other_tids in candidates:
+        buckets[tuple(other[:k-1])].append((other[k-1], other_tids))
+    frequent = {tuple(itemset) for itemset, _ in level_HOI}
+    next_candidates = []
+    for itemset, tids in level_HOI:
+        for last, other_tids in buckets[tuple(itemset[:k-1])]:
+            if last > itemset[k-1]:
+                new_itemset = itemset + [last]
+                # Bỏ lần lượt từng mục trừ mục cuối (tập con đó chính là itemset)
+                if any(tuple(new_itemset[:i] + new_itemset[i+1:]) not in frequent for i in range(k)):
+                    continue
+                next_candidates.append((new_itemset, tids & other_tids if tids is not None else None))
+    return next_candidates
+
+# Thu gọn CSDL làm việc (tid gốc -> các mục còn lại) trước mức k: bỏ khỏi
+# giao dịch các mục không còn trong ứng viên nào, bỏ giao dịch còn ít hơn k
+# mục hoặc (khi ứng viên mang tids) không chứa ứng viên nào. Mọi giao dịch
+# chứa một ứng viên đều được giữ nên IO/WIO không đổi; cận trên trên hợp tập
+# tid chỉ nhỏ đi và vẫn không nhỏ hơn giá trị thật. TO vẫn lấy theo tid gốc.
+def reduce_database(working, candidates, k):
+    surviving = {item for itemset, _ in candidates for item in itemset}
+    covered = None
+    if candidates and candidates[0][1] is not None:
+        covered = set().union(*(tids for _, tids in candidates))
+    reduced = {}
+    for tid, t in working.items():
+        if covered is not None and tid not in covered:
+            continue
+        t = t & surviving
+        if len(t) >= k:
+            reduced[tid] = t
+    return reduced
+
+# Tập tid của từng mục trên CSDL làm việc
+def index_items(working):
+    item_support = defaultdict(set)
+    for tid, t in working.items():
+        for item in t:
+            item_support[item].add(tid)
+    return item_support
+
+# Thuật toán HOIMTO theo tập tid từng mức (không quét CSDL cho mỗi ứng viên).
+# backend="sparse" tính IO/IOUB của cả mức trên ma trận thưa (sparse_counting.py,
+# cần SciPy); giá trị chỉ khác bản tập tid ở sai số cộng dồn. Sau mỗi mức CSDL
+# làm việc được thu gọn (reduce_database); stats (nếu có) nhận kích thước từng mức.
+def HOIMTO(database, MinIO, backend="sets", stats=None):
     TO = calculate_TO(database)
     HOI = []
-    # Tính tần suất cho 1-itemsets
-    item_support = defaultdict(list)
+    # Tập tid của từng mục (1-itemsets)
+    item_support = defaultdict(set)
     for tid, t in enumerate(database):
         for item in t:
-            item_support[item].append(tid)
+            item_support[item].add(tid)
+    working = {tid: t for tid, t in enumerate(database) if t}
     
     # Kiểm tra 1-itemsets
-    candidates = [[item] for item in item_support]
+    if backend == "sparse":
+        from sparse_counting import ItemMatrix
+        candidates = [([item], None) for item in item_support]
+    elif backend == "sets":
+        candidates = [([item], tids) for item, tids in item_support.items()]
+    else:
+        raise ValueError(f"Unknown backend '{backend}'")
     k = 1
     while candidates:
-        next_candidates = []
-        for itemset in candidates:
-            IO, IOUB, tids = calculate_IO_IOUB(itemset, database, TO)
+        if k > 1:
+            working = reduce_database(working, candidates, k)
+            item_support = index_items(working)
+        if stats is not None:
+            stats.append({'level': k, 'candidates': len(candidates), 'transactions': len(working),
+                          'occurrences': sum(len(t) for t in working.values())})
+
+        level_HOI = []
+        if backend == "sparse":
+            # Cột theo các mục của ứng viên (có thể không còn giao dịch nào)
+            items = dict.fromkeys(item for itemset, _ in candidates for item in itemset)
+            matrix = ItemMatrix(list(working.values()), items, [TO[tid] for tid in working])
+            IO_values, IOUB_values = matrix.evaluate([itemset for itemset, _ in candidates])
+            values = zip(IO_values.tolist(), IOUB_values.tolist())
+        else:
+            values = (calculate_IO_IOUB(itemset, tids, item_support, TO)[:2] for itemset, tids in candidates)
+        for (itemset, tids), (IO, IOUB) in zip(candidates, values):
             if IOUB >= MinIO:  # Cắt tỉa dựa trên IOUB
                 if IO >= MinIO:
                     HOI.append((itemset, IO))
-                    # Sinh k+1 itemsets
-                    if k == 1:
-                        next_candidates.extend([[itemset[0], new_item] for new_item in item_support if new_item > itemset[0]])
-                    else:
-                        for other in candidates:
-                            if other[:k-1] == itemset[:k-1] and other[k-1] > itemset[k-1]:
-                                next_candidates.append(itemset + [other[k-1]])
-        candidates = next_candidates
+                    level_HOI.append((itemset, tids))
+        # Sinh k+1 itemsets từ các HOI của mức này
+        candidates = join_candidates(level_HOI, candidates, k)
         k += 1
     
     return HOI
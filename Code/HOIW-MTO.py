@@ -25,44 +25,60 @@ def calculate_TO(database):
         exit()
     return [len(t) / total_items for t in database]
 
-# Tính Weighted Itemset Occupancy (WIO) và Weighted IOUB (WIOUB)
-def calculate_WIO_WIOUB(itemset, database, TO, weight_dict):
-    tids = [tid for tid, t in enumerate(database) if set(itemset).issubset(t)]
+# Tính Weighted Itemset Occupancy (WIO) và Weighted IOUB (WIOUB) từ tập tid:
+# tids là tập tid của itemset (giao của hai tập sinh ra nó); WIOUB lấy trên hợp
+# tập tid của các mục, mỗi giao dịch nhân với trọng số lớn nhất của các mục
+# của itemset có trong nó. Cộng theo tid tăng dần như khi quét CSDL.
+def calculate_WIO_WIOUB(itemset, tids, item_support, TO, weight_dict):
     # Tính WIO
-    WIO = sum(TO[tid] * sum(weight_dict[item] for item in itemset) / len(itemset) for tid in tids)
-    # Tính WIOUB
-    WIOUB = sum(TO[tid] * max(weight_dict[item] for item in itemset if item in t)
-                for tid, t in enumerate(database) if any(item in t for item in itemset))
+    total_weight = sum(weight_dict[item] for item in itemset)
+    WIO = sum(TO[tid] * total_weight / len(itemset) for tid in sorted(tids))
+    # Tính WIOUB: gán trọng số theo thứ tự giảm dần, giao dịch giữ trọng số lớn nhất
+    max_weight = {}
+    for item in sorted(itemset, key=lambda i: weight_dict[i], reverse=True):
+        for tid in item_support[item]:
+            max_weight.setdefault(tid, weight_dict[item])
+    WIOUB = sum(TO[tid] * max_weight[tid] for tid in sorted(max_weight))
     return WIO, WIOUB, tids
 
+# Sinh ứng viên k+1: gom mọi ứng viên mức k theo (k-1)-tiền tố, mỗi HOI chỉ
+# ghép với các ứng viên cùng nhóm có mục cuối lớn hơn (thứ tự như vòng lặp cũ).
+# Không cắt theo tập con: WIO không giảm đơn điệu khi thêm mục (trung bình
+# trọng số có thể tăng) nên tập con không phải HOI vẫn có thể có tập cha là HOI.
+def join_candidates(level_HOI, candidates, k):
+    buckets = defaultdict(list)
+    for other, other_tids in candidates:
+        buckets[tuple(other[:k-1])].append((other[k-1], other_tids))
+    next_candidates = []
+    for itemset, tids in level_HOI:
+        for last, other_tids in buckets[tuple(itemset[:k-1])]:
+            if last > itemset[k-1]:
+                next_candidates.append((itemset + [last], tids & other_tids))
+    return next_candidates
+
 # Thuật toán HOWI-MTO
 def HOWI_MTO(database, MinWIO, weight_dict):
     TO = calculate_TO(database)
     HOI = []
-    # Tính tần suất cho 1-itemsets
-    item_support = defaultdict(list)
+    # Tập tid của từng mục (1-itemsets)
+    item_support = defaultdict(set)
     for tid, t in enumerate(database):
         for item in t:
-            item_support[item].append(tid)
+            item_support[item].add(tid)
     
     # Kiểm tra 1-itemsets
-    candidates = [[item] for item in item_support]
+    candidates = [([item], tids) for item, tids in item_support.items()]
     k = 1
     while candidates:
-        next_candidates = []
-        for itemset in candidates:
-            WIO, WIOUB, tids = calculate_WIO_WIOUB(itemset, database, TO, weight_dict)
+        level_HOI = []
+        for itemset, tids in candidates:
+            WIO, WIOUB, tids = calculate_WIO_WIOUB(itemset, tids, item_support, TO, weight_dict)
             if WIOUB >= MinWIO:  # Cắt tỉa dựa trên WIOUB
                 if WIO >= MinWIO:
                     HOI.append((itemset, WIO))
-                    # Sinh k+1 itemsets
-                    if k == 1:
-                        next_candidates.extend([[itemset[0], new_item] for new_item in item_support if new_item > itemset[0]])
-                    else:
-                        for other in candidates:
-                            if other[:k-1] == itemset[:k-1] and other[k-1] > itemset[k-1]:
-                                next_candidates.append(itemset + [other[k-1]])
-        candidates = next_candidates
+                    level_HOI.append((itemset, tids))
+        # Sinh k+1 itemsets từ các HOI của mức này
+        candidates = join_candidates(level_HOI, candidates, k)
         k += 1
     
     return HOI
@@ -62,48 +62,123 @@ def calculate_weighted_support(database, TO, weight_dict, min_ws):
     print(f"Number of items after pruning (min_ws={min_ws}): {len(filtered_ws)}")
     return filtered_ws
 
-# Tính Weighted Itemset Occupancy (WIO) và Weighted IOUB (WIOUB)
-def calculate_WIO_WIOUB(itemset, database, TO, weight_dict):
-    tids = [tid for tid, t in enumerate(database) if set(itemset).issubset(t)]
+# Tính Weighted Itemset Occupancy (WIO) và Weighted IOUB (WIOUB) từ tập tid:
+# tids là tập tid của itemset (giao của hai tập sinh ra nó); WIOUB lấy trên hợp
+# tập tid của các mục, mỗi giao dịch nhân với trọng số lớn nhất của các mục
+# của itemset có trong nó. Cộng theo tid tăng dần như khi quét CSDL.
+def calculate_WIO_WIOUB(itemset, tids, item_support, TO, weight_dict):
     # Tính WIO
-    WIO = sum(TO[tid] * sum(weight_dict[item] for item in itemset) / len(itemset) for tid in tids)
-    # Tính WIOUB
-    WIOUB = sum(TO[tid] * max(weight_dict[item] for item in itemset if item in t)
-                for tid, t in enumerate(database) if any(item in t for item in itemset))
-    logging.debug(f"Itemset: {itemset}, WIO: {WIO:.3f}, WIOUB: {WIOUB:.3f}, tids: {tids}")
+    total_weight = sum(weight_dict[item] for item in itemset)
+    WIO = sum(TO[tid] * total_weight / len(itemset) for tid in sorted(tids))
+    # Tính WIOUB: gán trọng số theo thứ tự giảm dần, giao dịch giữ trọng số lớn nhất
+    max_weight = {}
+    for item in sorted(itemset, key=lambda i: weight_dict[i], reverse=True):
+        for tid in item_support[item]:
+            max_weight.setdefault(tid, weight_dict[item])
+    WIOUB = sum(TO[tid] * max_weight[tid] for tid in sorted(max_weight))
+    logging.debug(f"Itemset: {itemset}, WIO: {WIO:.3f}, WIOUB: {WIOUB:.3f}, tids: {sorted(tids)}")
     return WIO, WIOUB, tids
 
-# Thuật toán HOWI-MTO với cắt tỉa min_ws
-def HOWI_MTO(database, MinWIO, weight_dict, min_ws=0.1):
+# Sinh ứng viên k+1: gom mọi ứng viên mức k theo (k-1)-tiền tố, mỗi HOI chỉ
+# ghép với các ứng viên cùng nhóm có mục cuối lớn hơn (thứ tự như vòng lặp cũ).
+# Với backend="sparse" ứng viên không mang tids (None).
+# Không cắt theo tập con: WIO không giảm đơn điệu khi thêm mục (trung bình
+# trọng số có thể tăng) nên tập con không phải HOI vẫn có thể có tập cha là HOI.
+def join_candidates(level_HOI, candidates, k):
+    buckets = defaultdict(list)
+    for other, other_tids in candidates:
+        buckets[tuple(other[:k-1])].append((other[k-1], other_tids))
+    next_candidates = []
+    for itemset, tids in level_HOI:
+        for last, other_tids in buckets[tuple(itemset[:k-1])]:
+            if last > itemset[k-1]:
+                next_candidates.append((itemset + [last], tids & other_tids if tids is not None else None))
+    return next_candidates
+
+# Thu gọn CSDL làm việc (tid gốc -> các mục còn lại) trước mức k: bỏ khỏi
+# giao dịch các mục không còn trong ứng viên nào, bỏ giao dịch còn ít hơn k
+# mục hoặc (khi ứng viên mang tids) không chứa ứng viên nào. Mọi giao dịch
+# chứa một ứng viên đều được giữ nên IO/WIO không đổi; cận trên trên hợp tập
+# tid chỉ nhỏ đi và vẫn không nhỏ hơn giá trị thật. TO vẫn lấy theo tid gốc.
+def reduce_database(working, candidates, k):
+    surviving = {item for itemset, _ in candidates for item in itemset}
+    covered = None
+    if candidates and candidates[0][1] is not None:
+        covered = set().union(*(tids for _, tids in candidates))
+    reduced = {}
+    for tid, t in working.items():
+        if covered is not None and tid not in covered:
+            continue
+        t = t & surviving
+        if len(t) >= k:
+            reduced[tid] = t
+    return reduced
+
+# Tập tid của từng mục trên CSDL làm việc
+def index_items(working):
+    item_support = defaultdict(set)
+    for tid, t in working.items():
+        for item in t:
+            item_support[item].add(tid)
+    return item_support
+
+# Thuật toán HOWI-MTO với cắt tỉa min_ws. backend="sparse" tính WIO/WIOUB của
+# cả mức trên ma trận thưa (sparse_counting.py, cần SciPy); giá trị chỉ khác
+# bản tập tid ở sai số cộng dồn. Sau mỗi mức CSDL làm việc được thu gọn
+# (reduce_database); kích thước từng mức được ghi log và thêm vào stats (nếu có).
+def HOWI_MTO(database, MinWIO, weight_dict, min_ws=0.1, backend="sets", stats=None):
     TO = calculate_TO(database)
     # Tính Weighted Support và cắt tỉa
     ws = calculate_weighted_support(database, TO, weight_dict, min_ws)
     HOI = []
-    # Tính tần suất cho 1-itemsets
-    item_support = defaultdict(list)
+    # Tập tid của từng mục (1-itemsets)
+    item_support = defaultdict(set)
     for tid, t in enumerate(database):
         for item in t:
             if item in ws:
-                item_support[item].append(tid)
+                item_support[item].add(tid)
+    # CSDL làm việc chỉ giữ các mục qua min_ws
+    working = {tid: t & item_support.keys() for tid, t in enumerate(database)}
+    working = {tid: t for tid, t in working.items() if t}
     
     # Kiểm tra 1-itemsets
-    candidates = [[item] for item in item_support]
+    if backend == "sparse":
+        from sparse_counting import ItemMatrix
+        candidates = [([item], None) for item in item_support]
+    elif backend == "sets":
+        candidates = [([item], tids) for item, tids in item_support.items()]
+    else:
+        raise ValueError(f"Unknown backend '{backend}'")
     k = 1
     while candidates:
-        next_candidates = []
-        for itemset in candidates:
-            WIO, WIOUB, tids = calculate_WIO_WIOUB(itemset, database, TO, weight_dict)
+        if k > 1:
+            working = reduce_database(working, candidates, k)
+            item_support = index_items(working)
+        occurrences = sum(len(t) for t in working.values())
+        logging.info(f"Level {k}: {len(candidates)} candidates, {len(working)} transactions, "
+                     f"{occurrences} item occurrences")
+        if stats is not None:
+            stats.append({'level': k, 'candidates': len(candidates), 'transactions': len(working),
+                          'occurrences': occurrences})
+
+        level_HOI = []
+        if backend == "sparse":
+            # Cột theo các mục của ứng viên (có thể không còn giao dịch nào)
+            items = dict.fromkeys(item for itemset, _ in candidates for item in itemset)
+            matrix = ItemMatrix(list(working.values()), items, [TO[tid] for tid in working], weight_dict)
+            occupancy, WIOUB_values = matrix.evaluate([itemset for itemset, _ in candidates])
+            values = ((IO * sum(weight_dict[item] for item in itemset) / len(itemset), WIOUB)
+                      for (itemset, _), IO, WIOUB in zip(candidates, occupancy.tolist(), WIOUB_values.tolist()))
+        else:
+            values = (calculate_WIO_WIOUB(itemset, tids, item_support, TO, weight_dict)[:2]
+                      for itemset, tids in candidates)
+        for (itemset, tids), (WIO, WIOUB) in zip(candidates, values):
             if WIOUB >= MinWIO:  # Cắt tỉa dựa trên WIOUB
                 if WIO >= MinWIO:
                     HOI.append((itemset, WIO))
-                    # Sinh k+1 itemsets
-                    if k == 1:
-                        next_candidates.extend([[itemset[0], new_item] for new_item in item_support if new_item > itemset[0]])
-                    else:
-                        for other in candidates:
-                            if other[:k-1] == itemset[:k-1] and other[k-1] > itemset[k-1]:
-                                next_candidates.append(itemset + [other[k-1]])
-        candidates = next_candidates
+                    level_HOI.append((itemset, tids))
+        # Sinh k+1 itemsets từ các HOI của mức này
+        candidates = join_candidates(level_HOI, candidates, k)
         k += 1
     
     return HOI
@@ -13,18 +13,18 @@ class FPNode:
         self.children = {}
         self.node_link = None
 
-# Lớp FP-Tree
+# Lớp FP-Tree; tid_index (item -> tập tid) dùng chung cho mọi cây điều kiện,
+# tids là các giao dịch thuộc CSDL điều kiện của cây (None với cây gốc)
 class FPTree:
-    def __init__(self):
+    def __init__(self, tid_index=None, tids=None):
         self.root = FPNode(None, 0, None)
         self.header_table = defaultdict(list)
         self.item_counts = defaultdict(float)
-        self.tid_map = defaultdict(list)
+        self.tid_index = tid_index if tid_index is not None else {}
+        self.tids = tids
 
-    def add_transaction(self, transaction, count, tid):
+    def add_transaction(self, transaction, count):
         current = self.root
-        path = []
-        nodes_in_path = []
         for item in transaction:
             self.item_counts[item] += count
             if item in current.children:
@@ -34,9 +34,10 @@ class FPTree:
                 current.children[item] = new_node
                 self.header_table[item].append(new_node)
             current = current.children[item]
-            path.append(item)
-            nodes_in_path.append(current)
-        self.tid_map[tuple(path)].append((tid, count, nodes_in_path))
+
+    def item_tids(self, item):
+        tids = self.tid_index[item]
+        return tids if self.tids is None else tids & self.tids
 
     def print_tree(self, node=None, level=0, max_nodes=10):
         if max_nodes <= 0:
@@ -92,57 +93,48 @@ def calculate_weighted_support(database, TO, weight_dict, min_ws=0.01):
 # Xây dựng FP-Tree với cắt tỉa
 def build_fp_tree(database, TO, weight_dict, min_ws=0.01):
     ws = calculate_weighted_support(database, TO, weight_dict, min_ws)
-    tree = FPTree()
+    tid_index = defaultdict(set)
+    tree = FPTree(tid_index)
     for tid, t in enumerate(database):
         valid_items = [item for item in t if item in ws]
         if not valid_items:
             continue
-        sorted_items = sorted(valid_items, key=lambda x: ws[x], reverse=True)
-        tree.add_transaction(sorted_items, TO[tid], tid)
+        sorted_items = sorted(valid_items, key=lambda x: (-ws[x], x))
+        tree.add_transaction(sorted_items, TO[tid])
+        for item in valid_items:
+            tid_index[item].add(tid)
     return tree, ws
 
-# Tính WIO và WIOUB từ FP-Tree
-def calculate_WIO_WIOUB(itemset, fp_tree, TO, weight_dict):
-    tids = None
-    itemset = sorted(itemset, key=lambda x: fp_tree.item_counts[x], reverse=True)
-    for item in itemset:
-        item_tids = set()
-        for node in fp_tree.header_table[item]:
-            for path, tid_list in fp_tree.tid_map.items():
-                for tid, count, nodes in tid_list:
-                    if node in nodes:
-                        item_tids.add(tid)
-        if tids is None:
-            tids = item_tids
-        else:
+# Tính WIO và WIOUB từ chỉ mục tid thay vì quét tid_map. Nếu fp_growth đã
+# truyền tids = tids(prefix) & tids(item) thì không dựng lại từ đầu; tập cho
+# WIOUB cũng là tids vì trong cây điều kiện chỉ mục cuối có trong header.
+def calculate_WIO_WIOUB(itemset, fp_tree, TO, weight_dict, tids=None):
+    if tids is None:
+        tid_sets = sorted((fp_tree.tid_index[item] for item in itemset), key=len)
+        tids = set(tid_sets[0])
+        for item_tids in tid_sets[1:]:
             tids &= item_tids
+        
+        WIOUB_tids = set()
+        for item in itemset:
+            if item in fp_tree.header_table:
+                WIOUB_tids |= fp_tree.item_tids(item)
+    else:
+        WIOUB_tids = tids
     
     print(f"Debug - Itemset: {itemset}, tids: {tids}")
-    WIO = sum(TO[tid] * sum(weight_dict[item] for item in itemset) / len(itemset) for tid in tids) if tids else 0.0
-    
-    WIOUB_tids = set()
-    for item in itemset:
-        for node in fp_tree.header_table[item]:
-            for path, tid_list in fp_tree.tid_map.items():
-                for tid, count, nodes in tid_list:
-                    if node in nodes:
-                        WIOUB_tids.add(tid)
+    WIO = sum(TO[tid] for tid in tids) * sum(weight_dict[item] for item in itemset) / len(itemset) if tids else 0.0
     
     print(f"Debug - Itemset: {itemset}, WIOUB_tids: {WIOUB_tids}")
-    WIOUB = sum(TO[tid] * max(weight_dict[item] for item in itemset) for tid in WIOUB_tids) if WIOUB_tids else 0.0
+    WIOUB = sum(TO[tid] for tid in WIOUB_tids) * max(weight_dict[item] for item in itemset) if WIOUB_tids else 0.0
     
     print(f"Debug - Itemset: {itemset}, WIO: {WIO:.3f}, WIOUB: {WIOUB:.3f}")
     return WIO, WIOUB, tids
 
 # Ước lượng nhanh WIOUB cho một mục đơn
-def estimate_WIOUB(item, fp_tree, TO, weight_dict):
-    WIOUB_tids = set()
-    for node in fp_tree.header_table[item]:
-        for path, tid_list in fp_tree.tid_map.items():
-            for tid, count, nodes in tid_list:
-                if node in nodes:
-                    WIOUB_tids.add(tid)
-    WIOUB = sum(TO[tid] * weight_dict[item] for tid in WIOUB_tids) if WIOUB_tids else 0.0
+def estimate_WIOUB(item, fp_tree, TO, weight_dict, tids=None):
+    WIOUB_tids = fp_tree.item_tids(item) if tids is None else tids
+    WIOUB = sum(TO[tid] for tid in WIOUB_tids) * weight_dict[item] if WIOUB_tids else 0.0
     return WIOUB
 
 # Khai thác tập mục kiểu FP-Growth với cắt tỉa mạnh hơn
@@ -152,20 +144,22 @@ def fp_growth(fp_tree, TO, weight_dict, MinWIO, prefix=None, HOI=None):
     if prefix is None:
         prefix = []
     
-    # Lọc các mục có WIOUB >= MinWIO trước khi xử lý
+    # Lọc các mục có WIOUB >= MinWIO trước khi xử lý; tids(prefix + item)
+    # tính một lần ở đây rồi dùng lại cho WIO/WIOUB và cây điều kiện
     items = []
     for item in fp_tree.header_table.keys():
-        WIOUB = estimate_WIOUB(item, fp_tree, TO, weight_dict)
+        item_tids = fp_tree.item_tids(item)
+        WIOUB = estimate_WIOUB(item, fp_tree, TO, weight_dict, item_tids)
         if WIOUB >= MinWIO:
-            items.append((item, WIOUB))
+            items.append((item, item_tids))
     
     items = sorted(items, key=lambda x: fp_tree.item_counts[x[0]])
     
     print(f"Debug - Number of items after WIOUB pruning: {len(items)}")
     
-    for item, _ in items:
+    for item, item_tids in items:
         new_prefix = prefix + [item]
-        WIO, WIOUB, tids = calculate_WIO_WIOUB(new_prefix, fp_tree, TO, weight_dict)
+        WIO, WIOUB, tids = calculate_WIO_WIOUB(new_prefix, fp_tree, TO, weight_dict, item_tids)
         
         # Chỉ thêm nếu WIO >= MinWIO và WIOUB >= MinWIO
         if WIO >= MinWIO and WIOUB >= MinWIO:
@@ -186,10 +180,11 @@ def fp_growth(fp_tree, TO, weight_dict, MinWIO, prefix=None, HOI=None):
                 if path:
                     cond_pattern_base.append((path, node.count))
             
-            cond_tree = FPTree()
+            # Giữ thứ tự toàn cục của cây gốc: chỉ cần đảo đường đi lá -> gốc
+            cond_tree = FPTree(fp_tree.tid_index, tids)
             for path, count in cond_pattern_base:
-                sorted_path = sorted(path, key=lambda x: fp_tree.item_counts[x], reverse=True)
-                cond_tree.add_transaction(sorted_path, count, -1)
+                path.reverse()
+                cond_tree.add_transaction(path, count)
             
             # Kiểm tra lại cây con trước khi đệ quy
             if cond_tree.header_table:
@@ -7,6 +7,11 @@ import pandas as pd
 import logging
 from multiprocessing import Pool, cpu_count
 
+import numpy as np
+
+import fp_parallel
+import main
+
 # Thiết lập logging
 logging.basicConfig(level=logging.INFO, filename='howi_mto_step6.log', filemode='w',
                     format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,7 +24,6 @@ class FPNode:
         self.parent = parent
         self.children = {}
         self.node_link = None
-        self.tids = set()
 
 # Lớp FP-Tree
 class FPTree:
@@ -28,7 +32,7 @@ class FPTree:
         self.header_table = defaultdict(list)
         self.item_counts = defaultdict(float)
 
-    def add_transaction(self, transaction, count, tid):
+    def add_transaction(self, transaction, count):
         current = self.root
         for item in transaction:
             self.item_counts[item] += count
@@ -39,7 +43,6 @@ class FPTree:
                 current.children[item] = new_node
                 self.header_table[item].append(new_node)
             current = current.children[item]
-            current.tids.add(tid)
 
     def print_tree(self, node=None, level=0, max_nodes=10):
         if max_nodes <= 0:
@@ -56,17 +59,8 @@ class FPTree:
         return max_nodes
 
 def load_weighted_database(file_path, weight_dict):
-    database = []
     try:
-        with open(file_path, 'r') as f:
-            for line in f:
-                parts = line.strip().split(':')
-                if len(parts) < 2:
-                    continue
-                items = parts[1].strip().split()
-                valid_items = [item for item in items if item in weight_dict]
-                if valid_items:
-                    database.append(set(valid_items))
+        database = main.load_weighted_database(file_path, weight_dict)
     except FileNotFoundError:
         logging.error(f"File '{file_path}' not found.")
         print(f"Error: File '{file_path}' not found.")
@@ -87,76 +81,86 @@ def load_weight_dict(file_path):
         return {}
 
 def calculate_WTO(database, weight_dict):
-    total_weight = 0.0
-    transaction_weights = []
-    for t in database:
-        trans_weight = sum(weight_dict.get(item, 0.0) for item in t)
-        transaction_weights.append(trans_weight)
-        total_weight += trans_weight
-    if total_weight == 0:
+    WTO = main.calculate_WTO(database)
+    if not WTO.any():
         logging.error("Total weight is zero. Database may be empty or weights are invalid.")
         print("Error: Total weight is zero.")
-        return [0] * len(database)
-    if all(w == 0 for w in transaction_weights):
-        logging.warning("All transaction weights are zero. Using uniform WTO.")
-        return [1.0 / len(database)] * len(database)
-    WTO = [tw / total_weight for tw in transaction_weights]
     logging.debug(f"WTO values: {WTO[:5]}... (first 5 transactions)")
     return WTO
 
 def calculate_weighted_support(database, WTO, weight_dict, min_ws=0.01):
-    ws = defaultdict(float)
-    for tid, t in enumerate(database):
-        for item in t:
-            ws[item] += WTO[tid] * weight_dict[item]
-    filtered_ws = {item: w for item, w in ws.items() if w >= min_ws}
+    ws = main.calculate_weighted_support(database, WTO)
+    filtered_ws = {database.codes[i]: ws[i] for i in np.flatnonzero(ws >= min_ws).tolist()}
     logging.info(f"Number of items after pruning (min_ws={min_ws}): {len(filtered_ws)}")
     print(f"Number of items after pruning (min_ws={min_ws}): {len(filtered_ws)}")
     return filtered_ws
 
 def build_fp_tree(database, WTO, weight_dict, min_ws=0.01):
     ws = calculate_weighted_support(database, WTO, weight_dict, min_ws)
+    occupancy = WTO.tolist()
     tree = FPTree()
-    for tid, t in enumerate(database):
-        valid_items = [item for item in t if item in ws]
+    for tid, t in enumerate(database.transactions()):
+        valid_items = [database.codes[i] for i in t if database.codes[i] in ws]
         if not valid_items:
             continue
         sorted_items = sorted(valid_items, key=lambda x: ws[x], reverse=True)
-        tree.add_transaction(sorted_items, WTO[tid], tid)
+        tree.add_transaction(sorted_items, occupancy[tid])
     return tree, ws
 
-def calculate_WIO_WIOUB(itemset, fp_tree, WTO, weight_dict):
-    itemset = sorted(itemset, key=lambda x: fp_tree.item_counts[x], reverse=True)
-    tids = None
-    for item in itemset:
-        item_tids = set()
-        for node in fp_tree.header_table[item]:
-            item_tids.update(node.tids)
-        tids = item_tids if tids is None else tids & item_tids
-    WIO = sum(WTO[tid] * sum(weight_dict[item] for item in itemset) / len(itemset)
-              for tid in tids) if tids else 0.0
-    WIOUB_tids = set()
-    for item in itemset:
-        for node in fp_tree.header_table[item]:
-            WIOUB_tids.update(node.tids)
-    WIOUB = sum(WTO[tid] * max(weight_dict[item] for item in itemset)
-                for tid in WIOUB_tids) if WIOUB_tids else 0.0
-    return WIO, WIOUB, tids
+# WIO/WIOUB từ tổng count của mục cuối trong cây điều kiện hiện tại
+# (bằng tổng WTO của các giao dịch chứa itemset), không cần tập tid
+def WIO_from_occupancy(itemset, occupancy, weight_dict):
+    weights = [weight_dict[item] for item in itemset]
+    WIO = occupancy * sum(weights) / len(weights)
+    WIOUB = occupancy * max(weights)
+    return WIO, WIOUB
 
 def estimate_WIOUB(item, fp_tree, WTO, weight_dict):
-    WIOUB_tids = set()
+    return fp_tree.item_counts[item] * weight_dict[item]
+
+def conditional_pattern_base(fp_tree, item):
+    cond_pattern_base = []
     for node in fp_tree.header_table[item]:
-        WIOUB_tids.update(node.tids)
-    WIOUB = sum(WTO[tid] * weight_dict[item] for tid in WIOUB_tids) if WIOUB_tids else 0.0
-    return WIOUB
+        path = []
+        current = node
+        while current.parent is not None and current.parent.item is not None:
+            path.append(current.parent.item)
+            current = current.parent
+        if path:
+            path.reverse()
+            cond_pattern_base.append((path, node.count))
+    return cond_pattern_base
+
+def build_conditional_tree(cond_pattern_base):
+    cond_tree = FPTree()
+    for path, count in cond_pattern_base:
+        cond_tree.add_transaction(path, count)
+    return cond_tree
 
-# Worker function dùng cho multiprocessing
-def evaluate_item(item, prefix, fp_tree, WTO, weight_dict, MinWIO):
-    new_prefix = prefix + [item]
-    WIO, WIOUB, tids = calculate_WIO_WIOUB(new_prefix, fp_tree, WTO, weight_dict)
-    return (item, new_prefix, WIO, WIOUB, tids)
+# Dữ liệu dùng chung của các worker, nạp một lần qua initializer của Pool
+_worker_data = {}
 
-def fp_growth(fp_tree, WTO, weight_dict, MinWIO, prefix=None, HOI=None):
+# Cây toàn cục dạng mảng (mục là rank, items[rank] là StockCode) nằm trong
+# shared_memory của fp_parallel.SharedFPTree; worker gắn vào theo layout
+def init_worker(layout, items, weight_dict, MinWIO):
+    blocks, views = fp_parallel.attach_tree(layout)
+    _worker_data['blocks'] = blocks
+    _worker_data['tree'] = views
+    _worker_data['items'] = items
+    _worker_data['weight_dict'] = weight_dict
+    _worker_data['MinWIO'] = MinWIO
+
+# Worker khai thác trọn cây con của một mục ở mức trên cùng; task chỉ là rank
+def mine_subtree(rank):
+    items = _worker_data['items']
+    cond_pattern_base = [([items[r] for r in path], count) for path, count in
+                         fp_parallel.shared_prefix_paths(_worker_data['tree'], rank)]
+    cond_tree = build_conditional_tree(cond_pattern_base)
+    return fp_growth(cond_tree, None, _worker_data['weight_dict'], _worker_data['MinWIO'], [items[rank]])
+
+# Với pool, mỗi cây con ở mức này là một task; kết quả được chèn lại đúng vị
+# trí như khi chạy tuần tự
+def fp_growth(fp_tree, WTO, weight_dict, MinWIO, prefix=None, HOI=None, pool=None):
     if HOI is None:
         HOI = []
     if prefix is None:
@@ -171,32 +175,27 @@ def fp_growth(fp_tree, WTO, weight_dict, MinWIO, prefix=None, HOI=None):
 
     logging.info(f"Number of items after WIOUB pruning: {len(items)}")
 
-    with Pool(processes=cpu_count()) as pool:
-        results = pool.starmap(
-            evaluate_item,
-            [(item, prefix, fp_tree, WTO, weight_dict, MinWIO) for item in items]
-        )
-
-    for item, new_prefix, WIO, WIOUB, tids in results:
+    subtrees = []
+    for item in items:
+        new_prefix = prefix + [item]
+        WIO, WIOUB = WIO_from_occupancy(new_prefix, fp_tree.item_counts[item], weight_dict)
         if WIO >= MinWIO and WIOUB >= MinWIO:
             HOI.append((new_prefix, WIO))
             logging.info(f"Added itemset: {new_prefix}, WIO: {WIO:.3f}, WIOUB: {WIOUB:.3f}")
         if WIOUB >= MinWIO:
-            cond_pattern_base = []
-            for node in fp_tree.header_table[item]:
-                path = []
-                current = node
-                while current.parent is not None and current.parent.item is not None:
-                    path.append(current.parent.item)
-                    current = current.parent
-                if path:
-                    cond_pattern_base.append((path, node.count))
-            cond_tree = FPTree()
-            for path, count in cond_pattern_base:
-                sorted_path = sorted(path, key=lambda x: fp_tree.item_counts[x], reverse=True)
-                cond_tree.add_transaction(sorted_path, count, -1)
+            if pool is not None:
+                subtrees.append((len(HOI), item))
+                continue
+            cond_tree = build_conditional_tree(conditional_pattern_base(fp_tree, item))
             if cond_tree.header_table:
                 fp_growth(cond_tree, WTO, weight_dict, MinWIO, new_prefix, HOI)
+
+    if subtrees:
+        # rank theo thứ tự khoá của header_table, như fp_parallel.flatten_tree
+        rank = {item: r for r, item in enumerate(fp_tree.header_table)}
+        subtree_HOI = pool.map(mine_subtree, [rank[item] for _, item in subtrees], chunksize=1)
+        for (position, _), found in reversed(list(zip(subtrees, subtree_HOI))):
+            HOI[position:position] = found
     return HOI
 
 def HOWI_MTO(database, MinWIO, weight_dict, min_ws=0.01):
@@ -204,7 +203,20 @@ def HOWI_MTO(database, MinWIO, weight_dict, min_ws=0.01):
     fp_tree, ws = build_fp_tree(database, WTO, weight_dict, min_ws)
     logging.info("FP-Tree structure (first 10 nodes):")
     fp_tree.print_tree(max_nodes=10)
-    hoimto_results = fp_growth(fp_tree, WTO, weight_dict, MinWIO)
+    # Một Pool cho cả lần chạy (cây toàn cục dạng mảng nằm trong
+    # shared_memory), mỗi task là rank của một mục ở mức trên cùng; một lõi
+    # thì chạy tuần tự
+    if cpu_count() == 1:
+        return fp_growth(fp_tree, WTO, weight_dict, MinWIO)
+    flat_tree, items = fp_parallel.flatten_tree(fp_tree)
+    weights = {item: weight_dict[item] for item in items}
+    shared_tree = fp_parallel.SharedFPTree(flat_tree, list(weights.values()))
+    try:
+        with Pool(processes=cpu_count(), initializer=init_worker,
+                  initargs=(shared_tree.layout, items, weights, MinWIO)) as pool:
+            hoimto_results = fp_growth(fp_tree, WTO, weight_dict, MinWIO, pool=pool)
+    finally:
+        shared_tree.close()
     return hoimto_results
 
 def get_memory_usage():
@@ -0,0 +1,107 @@
+from collections import defaultdict
+from itertools import combinations
+import random
+import time
+
+from item_encoding import encode_transactions
+from main import (HOWI_MTO, calculate_TO, calculate_weighted_support, load_weight_dict,
+                  load_weighted_database)
+
+# Sai số tuyệt đối khi so sánh WIO của HOWI_MTO với phép vét cạn
+WIO_TOLERANCE = 1e-9
+
+# Cơ sở dữ liệu tổng hợp nhỏ: các mục "I0".."In" với trọng số ngẫu nhiên
+def make_synthetic(rng, num_items, num_transactions, max_len):
+    items = [f"I{i}" for i in range(num_items)]
+    weight_dict = {item: round(rng.uniform(0.05, 1.0), 3) for item in items}
+    database = [rng.sample(items, rng.randint(1, min(max_len, num_items))) for _ in range(num_transactions)]
+    return database, weight_dict
+
+# Vét cạn: WIO của mọi tập con khác rỗng của các mục còn lại sau min_ws
+def brute_force_WIO(database, weight_dict, min_ws):
+    encoded = encode_transactions(database, weight_dict)
+    TO = calculate_TO(encoded)
+    ws = calculate_weighted_support(encoded, TO)
+    kept = [encoded.codes[i] for i in range(len(encoded.codes)) if ws[i] >= min_ws]
+    transactions = [set(encoded.decode(t.tolist())) for t in encoded]
+
+    values = {}
+    for size in range(1, len(kept) + 1):
+        for itemset in combinations(kept, size):
+            occupancy = sum(TO[tid] for tid, t in enumerate(transactions) if t.issuperset(itemset))
+            if occupancy > 0:
+                values[frozenset(itemset)] = sum(weight_dict[i] for i in itemset) / size * occupancy
+    return values
+
+# Chạy trên nhiều CSDL ngẫu nhiên: bound="remaining" phải trả về đúng tập
+# HOI của phép vét cạn; bound="wioub" được ghi lại số HOI bị bỏ sót
+def check_bound(num_databases=200, seed=0):
+    rng = random.Random(seed)
+    failures = 0
+    wioub_missed = 0
+    total_hoi = 0
+    for _ in range(num_databases):
+        database, weight_dict = make_synthetic(rng, rng.randint(4, 11), rng.randint(5, 40), rng.randint(2, 7))
+        min_ws = rng.choice([0.0, 0.01, 0.05])
+        values = brute_force_WIO(database, weight_dict, min_ws)
+        if not values:
+            continue
+        # MinWIO nằm giữa hai giá trị WIO liên tiếp để tránh so sánh sát biên;
+        # các WIO chỉ khác nhau do sai số làm tròn (< WIO_TOLERANCE) được gộp
+        # làm một, nếu không điểm giữa của chúng rơi đúng vào biên
+        distinct = []
+        for value in sorted(values.values()):
+            if not distinct or value - distinct[-1] > WIO_TOLERANCE:
+                distinct.append(value)
+        k = rng.randrange(len(distinct))
+        MinWIO = (distinct[k] + distinct[k - 1]) / 2 if k > 0 else distinct[0] / 2
+
+        expected = {itemset for itemset, WIO in values.items() if WIO >= MinWIO}
+        found = {frozenset(itemset): WIO for itemset, WIO in
+                 HOWI_MTO(database, MinWIO, weight_dict, min_ws, bound="remaining")}
+        wioub = {frozenset(itemset) for itemset, _ in HOWI_MTO(database, MinWIO, weight_dict, min_ws)}
+
+        total_hoi += len(expected)
+        wioub_missed += len(expected - wioub)
+        if set(found) != expected or any(abs(found[x] - values[x]) > WIO_TOLERANCE for x in found):
+            failures += 1
+            print(f"Mismatch: MinWIO={MinWIO}, min_ws={min_ws}, "
+                  f"missing={expected - set(found)}, extra={set(found) - expected}")
+
+    print(f"\n=== Brute-force check on {num_databases} synthetic databases ===")
+    print(f"Total HOIs: {total_hoi}")
+    print(f"Databases where bound='remaining' differs from brute force: {failures}")
+    print(f"HOIs missed by bound='wioub': {wioub_missed}")
+    return failures == 0
+
+# So sánh hai cách cắt tỉa trên dữ liệu thật: số ứng viên bị cắt, số cây
+# điều kiện được dựng, số HOI và thời gian
+def compare_bounds(database, MinWIO, weight_dict, min_ws=0.01):
+    rows = {}
+    for bound in ["wioub", "remaining"]:
+        stats = defaultdict(int)
+        start = time.time()
+        results = HOWI_MTO(database, MinWIO, weight_dict, min_ws, bound=bound, stats=stats)
+        rows[bound] = (stats, len(results), time.time() - start, {frozenset(x) for x, _ in results})
+
+    print(f"\n=== Pruning bound: WIOUB vs remaining-weight (MinWIO={MinWIO}, min_ws={min_ws}) ===")
+    print(f"{'Metric':<28} {'WIOUB':<15} {'Remaining':<15}")
+    print("-" * 58)
+    for key, label in [('candidates', 'Candidates checked'), ('pruned', 'Candidates pruned'),
+                       ('max_weight_pruned', '  by max-weight bound'),
+                       ('expanded', 'Conditional trees built')]:
+        print(f"{label:<28} {rows['wioub'][0][key]:<15} {rows['remaining'][0][key]:<15}")
+    print(f"{'Number of Itemsets':<28} {rows['wioub'][1]:<15} {rows['remaining'][1]:<15}")
+    print(f"{'Time (s)':<28} {rows['wioub'][2]:<15.3f} {rows['remaining'][2]:<15.3f}")
+    print(f"HOIs missed by WIOUB: {len(rows['remaining'][3] - rows['wioub'][3])}")
+
+if __name__ == "__main__":
+    check_bound()
+
+    transactions_file = "online_retail_transactions.txt"
+    weights_file = "weight_dict.txt"
+
+    weight_dict = load_weight_dict(weights_file)
+    database = load_weighted_database(transactions_file, weight_dict)
+    for MinWIO, min_ws in [(0.05, 0.05), (0.02, 0.1)]:
+        compare_bounds(database, MinWIO, weight_dict, min_ws)
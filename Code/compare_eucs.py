@@ -0,0 +1,40 @@
+from collections import defaultdict
+import time
+
+from main import (HOWI_MTO, calculate_TO, calculate_co_occupancy, calculate_weighted_support,
+                  load_weight_dict, load_weighted_database, rank_items)
+
+# So sánh fp_growth có và không có cắt tỉa theo ma trận đồng chiếm dụng
+def compare_eucs(database, MinWIO, weight_dict, min_ws=0.01):
+    TO = calculate_TO(database)
+    labels, rank = rank_items(calculate_weighted_support(database, TO), min_ws)
+    start = time.time()
+    calculate_co_occupancy(database, TO, rank, len(labels))
+    matrix_time = time.time() - start
+
+    rows = {}
+    for eucs in [False, True]:
+        stats = defaultdict(int)
+        start = time.time()
+        results = HOWI_MTO(database, MinWIO, weight_dict, min_ws, stats=stats, eucs=eucs)
+        rows[eucs] = (stats, time.time() - start, results)
+
+    print(f"\n=== FP-growth: without vs with co-occupancy pruning (MinWIO={MinWIO}, min_ws={min_ws}) ===")
+    print(f"{'Metric':<28} {'Without':<15} {'With':<15}")
+    print("-" * 58)
+    print(f"{'Ranked items':<28} {len(labels):<15} {len(labels):<15}")
+    print(f"{'Matrix build time (s)':<28} {'-':<15} {matrix_time:<15.3f}")
+    print(f"{'Candidates checked':<28} {rows[False][0]['candidates']:<15} {rows[True][0]['candidates']:<15}")
+    print(f"{'Conditional trees built':<28} {rows[False][0]['expanded']:<15} {rows[True][0]['expanded']:<15}")
+    print(f"{'Total time (s)':<28} {rows[False][1]:<15.3f} {rows[True][1]:<15.3f}")
+    print(f"{'Number of Itemsets':<28} {len(rows[False][2]):<15} {len(rows[True][2]):<15}")
+    print(f"Same results: {rows[False][2] == rows[True][2]}")
+
+if __name__ == "__main__":
+    transactions_file = "online_retail_transactions.txt"
+    weights_file = "weight_dict.txt"
+
+    weight_dict = load_weight_dict(weights_file)
+    database = load_weighted_database(transactions_file, weight_dict)
+    for MinWIO, min_ws in [(0.05, 0.05), (0.05, 0.01), (0.02, 0.1), (0.01, 0.1)]:
+        compare_eucs(database, MinWIO, weight_dict, min_ws)
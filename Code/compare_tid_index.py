@@ -0,0 +1,94 @@
+import time
+from collections import defaultdict
+
+from main import (HOWI_MTO, build_fp_tree, calculate_TO, calculate_WIO_WIOUB, estimate_WIOUB,
+                  load_weight_dict, load_weighted_database, rank_items, ranked_transactions)
+
+# Dựng lại tid_map kiểu cũ (đường đi -> [(tid, count, nodes)]) trên cây gốc
+def build_tid_map(fp_tree, database, TO, ws, min_ws):
+    labels, rank = rank_items(ws, min_ws)
+    labels = labels.tolist()
+    tid_map = defaultdict(list)
+    for tid, path in zip(*ranked_transactions(database, rank)):
+        path = [labels[r] for r in path]
+        current = fp_tree.root
+        nodes_in_path = []
+        for item in path:
+            current = current.children[item]
+            nodes_in_path.append(current)
+        tid_map[tuple(path)].append((tid, TO[tid], nodes_in_path))
+    return tid_map
+
+# Cách tính cũ: quét mọi nút header x mọi đường đi trong tid_map
+def scan_item_tids(item, fp_tree, tid_map):
+    item_tids = set()
+    for node in fp_tree.header_table[item]:
+        for path, tid_list in tid_map.items():
+            for tid, count, nodes in tid_list:
+                if any(n.item == node.item for n in nodes):
+                    item_tids.add(tid)
+    return item_tids
+
+def scan_WIO_WIOUB(itemset, fp_tree, tid_map, TO, weight_dict):
+    tids = None
+    for item in itemset:
+        item_tids = scan_item_tids(item, fp_tree, tid_map)
+        tids = item_tids if tids is None else tids & item_tids
+    WIO = sum(TO[tid] * sum(weight_dict[i] for i in itemset) / len(itemset) for tid in tids) if tids else 0.0
+    WIOUB_tids = set()
+    for item in itemset:
+        WIOUB_tids |= scan_item_tids(item, fp_tree, tid_map)
+    WIOUB = sum(TO[tid] * max(weight_dict[i] for i in itemset) for tid in WIOUB_tids) if WIOUB_tids else 0.0
+    return WIO, WIOUB, tids
+
+def compare_tid_index(database, MinWIO, weight_dict, min_ws=0.1, sample=10):
+    TO = calculate_TO(database)
+    fp_tree, ws = build_fp_tree(database, TO, min_ws)
+    weights = database.weights.tolist()
+    tid_map = build_tid_map(fp_tree, database, TO, ws, min_ws)
+    occupancy = TO.tolist()
+
+    # Mẫu: các mục đơn và các tập 2 mục có trong kết quả
+    results = HOWI_MTO(database, MinWIO, weight_dict, min_ws)
+    singles = [database.encode(itemset) for itemset, _ in results if len(itemset) == 1][:sample]
+    pairs = [database.encode(itemset) for itemset, _ in results if len(itemset) == 2][:sample]
+
+    start = time.time()
+    old_values = []
+    for itemset in singles + pairs:
+        old_values.extend(scan_WIO_WIOUB(itemset, fp_tree, tid_map, occupancy, weights)[:2])
+    for item, in singles:
+        old_values.append(sum(occupancy[tid] for tid in scan_item_tids(item, fp_tree, tid_map)) * weights[item])
+    old_time = time.time() - start
+
+    start = time.time()
+    new_values = []
+    for itemset in singles + pairs:
+        new_values.extend(calculate_WIO_WIOUB(itemset, fp_tree, TO, weights)[:2])
+    for item, in singles:
+        new_values.append(estimate_WIOUB(item, fp_tree, TO, weights))
+    new_time = time.time() - start
+
+    same = all(abs(a - b) < 1e-9 for a, b in zip(old_values, new_values))
+    calls = len(singles) * 2 + len(pairs)
+
+    print(f"\n=== WIO/WIOUB: tid_map scan vs tid index (min_ws={min_ws}) ===")
+    print(f"{'Metric':<28} {'tid_map scan':<15} {'tid index':<15}")
+    print("-" * 58)
+    print(f"{'Calls':<28} {calls:<15} {calls:<15}")
+    print(f"{'Total time (s)':<28} {old_time:<15.3f} {new_time:<15.3f}")
+    print(f"{'Time per call (ms)':<28} {old_time / calls * 1000:<15.3f} {new_time / calls * 1000:<15.3f}")
+    print(f"Speedup: {old_time / new_time:.0f}x, same values: {same}")
+
+if __name__ == "__main__":
+    transactions_file = "online_retail_transactions.txt"
+    weights_file = "weight_dict.txt"
+
+    weight_dict = load_weight_dict(weights_file)
+    database = load_weighted_database(transactions_file, weight_dict)
+    compare_tid_index(database, 0.02, weight_dict, min_ws=0.1)
+
+    # Toàn bộ lần chạy: trước đây 136s ở MinWIO=0.01, min_ws=0.1 (chỉ 31 tập 1 mục)
+    start = time.time()
+    results = HOWI_MTO(database, 0.01, weight_dict, 0.1)
+    print(f"\nHOWI-MTO MinWIO=0.01, min_ws=0.1: {len(results)} itemsets in {time.time() - start:.3f} seconds")
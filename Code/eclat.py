@@ -0,0 +1,402 @@
+from collections import defaultdict
+import time
+
+import numpy as np
+
+from item_encoding import EncodedDatabase, encode_transactions
+from main import (calculate_TO, calculate_weighted_support, load_weight_dict,
+                  load_weighted_database, rank_items)
+import main
+
+# Mật độ (số giao dịch trung bình của các tập tid trong một lớp / số giao
+# dịch) từ đó lớp được xử lý bằng bitmap thay cho mảng tid
+DENSE_THRESHOLD = 0.03
+
+# Tỉ lệ kích thước tập tid trung bình của các mục trong lớp so với tập tid
+# của prefix từ đó lớp chuyển sang diffset
+DIFFSET_RATIO = 0.5
+
+# Tập tid dạng bitmap uint64: tid nằm ở bit tid % 64 của word tid // 64.
+# Tổng TO có trọng số lấy qua bảng byte_sums[p, v] = tổng TO của các bit
+# bật trong byte giá trị v ở vị trí byte p, nên một lần tổng chỉ cần một
+# phép gather trên các byte của bitmap thay vì duyệt từng tid.
+class TidBitmaps:
+    def __init__(self, TO):
+        self.num_tids = len(TO)
+        num_bytes = (self.num_tids + 63) // 64 * 8
+        padded = np.zeros(num_bytes * 8)
+        padded[:self.num_tids] = TO
+        byte_bits = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder='little')
+        self.byte_sums = padded.reshape(num_bytes, 8) @ byte_bits.T.astype(np.float64)
+        self.byte_popcount = byte_bits.sum(axis=1)
+        self.positions = np.arange(num_bytes)
+
+    def from_tids(self, tids):
+        bits = np.zeros(len(self.positions) * 8, dtype=bool)
+        bits[tids] = True
+        return np.packbits(bits, bitorder='little').view(np.uint64)
+
+    def to_tids(self, bitmap):
+        bits = np.unpackbits(bitmap.view(np.uint8), bitorder='little')
+        return np.flatnonzero(bits).astype(np.int32)
+
+    def weighted_sum(self, bitmap):
+        return self.byte_sums[self.positions, bitmap.view(np.uint8)].sum()
+
+    def cardinality(self, bitmap):
+        return int(self.byte_popcount[bitmap.view(np.uint8)].sum())
+
+# Chọn cách biểu diễn cho một lớp và chuyển đổi nếu cần. mode là 'tids'
+# (mảng tid), 'bitmap' hoặc 'diff' (diffset). Khi tập tid của các mục trong
+# lớp trung bình chiếm từ diffset_ratio tập tid của prefix trở lên, lớp
+# chuyển sang diffset: d(prefix + k) = tids(prefix) - tids(prefix + k), nhỏ
+# hơn tập tid. Diffset chỉ nhỏ dần khi xuống sâu nên không chuyển ngược lại.
+def choose_representation(candidates, mode, prefix_tids, bitmaps, dense_threshold, diffset_ratio):
+    if not candidates or mode == 'diff':
+        return candidates, mode
+    if mode == 'bitmap':
+        sizes = [bitmaps.cardinality(tids) for _, tids, _ in candidates]
+    else:
+        sizes = [len(tids) for _, tids, _ in candidates]
+    mean_size = sum(sizes) / len(sizes)
+
+    if diffset_ratio is not None and prefix_tids is not None:
+        prefix_size = bitmaps.cardinality(prefix_tids) if mode == 'bitmap' else len(prefix_tids)
+        if mean_size >= diffset_ratio * prefix_size:
+            if mode == 'bitmap':
+                diff = lambda tids: bitmaps.to_tids(prefix_tids & ~tids)
+            else:
+                diff = lambda tids: difference_sorted(prefix_tids, tids)
+            return [(item, diff(tids), count) for item, tids, count in candidates], 'diff'
+
+    if bitmaps is None:
+        return candidates, mode
+    new_mode = 'bitmap' if mean_size >= dense_threshold * bitmaps.num_tids else 'tids'
+    if new_mode == mode:
+        return candidates, mode
+    convert = bitmaps.from_tids if new_mode == 'bitmap' else bitmaps.to_tids
+    return [(item, convert(tids), count) for item, tids, count in candidates], new_mode
+
+# Tìm nhị phân các phần tử của a (tăng dần) trong b (tăng dần)
+def _member_mask(a, b):
+    if len(b) == 0:
+        return np.zeros(len(a), dtype=bool)
+    idx = np.searchsorted(b, a)
+    idx[idx == len(b)] = 0
+    return b[idx] == a
+
+# Giao của hai mảng tid tăng dần: tìm nhị phân mảng ngắn trong mảng dài
+def intersect_sorted(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) == 0:
+        return a
+    return a[_member_mask(a, b)]
+
+# Hiệu a - b của hai mảng tid tăng dần
+def difference_sorted(a, b):
+    if len(a) == 0:
+        return a
+    return a[~_member_mask(a, b)]
+
+# Duyệt theo chiều sâu trên các lớp tương đương. candidates là các mục mở
+# rộng được của prefix, theo rank tăng dần, kèm tập tid của prefix + item
+# (theo mode của lớp) và TO tương ứng. Như cây điều kiện của FP-growth,
+# prefix + item chỉ được mở rộng bằng các mục có rank nhỏ hơn item:
+# - 'tids'/'bitmap': tids(prefix + item + k) = tids(prefix + item) giao tids(prefix + k)
+# - 'diff': d(prefix + item + k) = d(prefix + k) - d(prefix + item) và
+#   TO(prefix + item + k) = TO(prefix + item) - TO của diffset đó.
+# Lớp đủ dày (xem DENSE_THRESHOLD) dùng bitmap; lớp gần bằng prefix của nó
+# (xem DIFFSET_RATIO) dùng diffset. stats (nếu có) đếm số lớp và số phần tử
+# mảng được lưu theo từng cách biểu diễn.
+def eclat(prefix, candidates, TO, weight_dict, MinWIO, HOI, bitmaps=None,
+          dense_threshold=DENSE_THRESHOLD, diffset_ratio=DIFFSET_RATIO, mode='tids',
+          prefix_tids=None, stats=None):
+    candidates, mode = choose_representation(candidates, mode, prefix_tids, bitmaps,
+                                             dense_threshold, diffset_ratio)
+    if stats is not None:
+        stats[mode + '_classes'] += 1
+        stats[mode + '_elements'] += sum(len(tids) for _, tids, _ in candidates)
+    for idx, (item, tids, count) in enumerate(candidates):
+        new_prefix = prefix + [item]
+        weights = [weight_dict[i] for i in new_prefix]
+        WIO = sum(weights) / len(weights) * count
+        WIOUB = max(weights) * count
+
+        if WIO >= MinWIO and WIOUB >= MinWIO:
+            HOI.append((new_prefix, WIO))
+
+        if WIOUB >= MinWIO:
+            new_candidates = []
+            for other, other_tids, _ in candidates[:idx]:
+                if mode == 'diff':
+                    new_tids = difference_sorted(other_tids, tids)
+                    new_count = count - TO[new_tids].sum()
+                elif mode == 'bitmap':
+                    new_tids = tids & other_tids
+                    new_count = bitmaps.weighted_sum(new_tids)
+                else:
+                    new_tids = intersect_sorted(tids, other_tids)
+                    if len(new_tids) == 0:
+                        continue
+                    new_count = TO[new_tids].sum()
+                if new_count > 0 and weight_dict[other] * new_count >= MinWIO:
+                    new_candidates.append((other, new_tids, new_count))
+            if new_candidates:
+                eclat(new_prefix, new_candidates, TO, weight_dict, MinWIO, HOI,
+                      bitmaps, dense_threshold, diffset_ratio, mode, tids, stats)
+
+    return HOI
+
+# Các mục còn lại sau min_ws (kept[id] = True) có mặt trong mọi giao dịch
+# của tids, đếm trực tiếp trên dữ liệu CSR
+def common_items(database, kept, tids):
+    starts = database.offsets[tids]
+    lengths = database.offsets[tids + 1] - starts
+    first = np.cumsum(lengths) - lengths
+    positions = np.repeat(starts - first, lengths) + np.arange(lengths.sum())
+    counts = np.bincount(database.items[positions], minlength=len(kept))
+    return np.flatnonzero((counts == len(tids)) & kept)
+
+# Chỉ mục bao hàm cho chế độ maximal: mục -> bitmask (số nguyên Python) các
+# id itemset đang giữ chứa mục đó, nên truy vấn tập cha chỉ là AND các mask.
+# add() bỏ qua itemset đã có tập cha trong chỉ mục; tập cha tìm thấy sau
+# một tập con (ở nhánh sau) được xử lý một lần trong results() bằng cách
+# dựng lại chỉ mục theo kích thước giảm dần, nên không phải xoá từng tập con.
+class SubsumptionIndex:
+    def __init__(self):
+        self.itemsets = []  # (frozenset, itemset, WIO)
+        self.postings = defaultdict(int)
+
+    def has_superset(self, items):
+        mask = -1
+        for item in items:
+            mask &= self.postings.get(item, 0)
+            if not mask:
+                return False
+        return True
+
+    def add(self, itemset, WIO):
+        items = frozenset(itemset)
+        if self.has_superset(items):
+            return
+        bit = 1 << len(self.itemsets)
+        for item in items:
+            self.postings[item] |= bit
+        self.itemsets.append((items, itemset, WIO))
+
+    def results(self):
+        kept = SubsumptionIndex()
+        for items, itemset, WIO in sorted(self.itemsets, key=lambda x: len(x[0]), reverse=True):
+            kept.add(itemset, WIO)
+        return [(itemset, WIO) for _, itemset, WIO in kept.itemsets]
+
+# Cùng phép duyệt như eclat (chỉ mảng tid) nhưng chỉ giữ HOI đóng hoặc tối đại.
+# - closed: HOI không có tập cha thực sự (trên các mục còn lại sau min_ws)
+#   cùng tập tid. Bao đóng của prefix + item là các mục có mặt trong mọi giao
+#   dịch của nó. Nhánh chỉ thêm được các mục của candidates[:idx] (rank nhỏ
+#   hơn item, còn trong lớp); nếu bao đóng chứa một mục nằm ngoài phần đó
+#   (rank lớn hơn item, hoặc đã bị loại khỏi lớp) thì mọi tập trong nhánh đều
+#   thiếu mục ấy nên không đóng, và cả nhánh bị bỏ qua. Ngược lại, tập chỉ
+#   đóng khi bao đóng không có mục nào ngoài chính nó.
+# - maximal: HOI không có tập cha nào cũng là HOI. Nhánh con đã sinh HOI thì
+#   prefix + item không tối đại; các tập cha ở nhánh khác được xử lý bởi
+#   SubsumptionIndex. HOI nhận vào closed (list) hoặc index (maximal).
+# Trả về True nếu nhánh sinh ra ít nhất một HOI.
+def eclat_condensed(prefix, candidates, TO, weight_dict, MinWIO, HOI, output, database, kept):
+    found = False
+    for idx, (item, tids, count) in enumerate(candidates):
+        new_prefix = prefix + [item]
+        closed = True
+        if output == "closed":
+            extras = set(common_items(database, kept, tids).tolist()) - set(new_prefix)
+            if extras - {other for other, _, _ in candidates[:idx]}:
+                continue
+            closed = not extras
+
+        weights = [weight_dict[i] for i in new_prefix]
+        WIO = sum(weights) / len(weights) * count
+        WIOUB = max(weights) * count
+
+        found_below = False
+        if WIOUB >= MinWIO:
+            new_candidates = []
+            for other, other_tids, _ in candidates[:idx]:
+                new_tids = intersect_sorted(tids, other_tids)
+                if len(new_tids) == 0:
+                    continue
+                new_count = TO[new_tids].sum()
+                if weight_dict[other] * new_count >= MinWIO:
+                    new_candidates.append((other, new_tids, new_count))
+            if new_candidates:
+                found_below = eclat_condensed(new_prefix, new_candidates, TO, weight_dict, MinWIO,
+                                              HOI, output, database, kept)
+
+        is_hoi = WIO >= MinWIO and WIOUB >= MinWIO
+        if is_hoi:
+            if output == "closed" and closed:
+                HOI.append((new_prefix, WIO))
+            elif output == "maximal" and not found_below:
+                HOI.add(new_prefix, WIO)
+        found = found or is_hoi or found_below
+    return found
+
+# Thuật toán HOWI-MTO theo chiều dọc: cùng ngữ nghĩa và cùng kết quả với
+# main.HOWI_MTO, nhưng không dựng cây điều kiện. dense_threshold=None tắt
+# bitmap, diffset_ratio=None tắt diffset. output="closed"/"maximal" chỉ trả
+# về HOI đóng/tối đại (xem eclat_condensed, luôn dùng mảng tid, không đếm stats).
+def HOWI_MTO(database, MinWIO, weight_dict, min_ws=0.01, dense_threshold=DENSE_THRESHOLD,
+             diffset_ratio=DIFFSET_RATIO, stats=None, output="all"):
+    if stats is not None and output != "all":
+        raise ValueError(f"stats is only collected for output='all', not '{output}'")
+    if not isinstance(database, EncodedDatabase):
+        database = encode_transactions(database, weight_dict)
+    TO = calculate_TO(database)
+    ws = calculate_weighted_support(database, TO)
+    labels, _ = rank_items(ws, min_ws)
+    weights = database.weights.tolist()
+
+    tid_index = database.tid_index(labels)
+    candidates = []
+    for item in labels.tolist():
+        count = TO[tid_index[item]].sum()
+        if weights[item] * count >= MinWIO:
+            candidates.append((item, tid_index[item], count))
+    if output == "closed":
+        results = []
+        eclat_condensed([], candidates, TO, weights, MinWIO, results, output, database, ws >= min_ws)
+    elif output == "maximal":
+        index = SubsumptionIndex()
+        eclat_condensed([], candidates, TO, weights, MinWIO, index, output, database, ws >= min_ws)
+        results = index.results()
+    elif output == "all":
+        bitmaps = TidBitmaps(TO) if dense_threshold is not None and candidates else None
+        results = eclat([], candidates, TO, weights, MinWIO, [], bitmaps, dense_threshold,
+                        diffset_ratio, stats=stats)
+    else:
+        raise ValueError(f"Unknown output '{output}'")
+    return [(database.decode(itemset), WIO) for itemset, WIO in results]
+
+# So sánh FP-growth (main.py) với Eclat (chỉ mảng tid và tự chọn bitmap)
+def compare_engines(database, MinWIO, weight_dict, min_ws=0.01):
+    start = time.time()
+    fp_results = main.HOWI_MTO(database, MinWIO, weight_dict, min_ws)
+    fp_time = time.time() - start
+
+    start = time.time()
+    tid_results = HOWI_MTO(database, MinWIO, weight_dict, min_ws, dense_threshold=None, diffset_ratio=None)
+    tid_time = time.time() - start
+
+    start = time.time()
+    auto_results = HOWI_MTO(database, MinWIO, weight_dict, min_ws)
+    auto_time = time.time() - start
+
+    fp_set = {frozenset(itemset) for itemset, _ in fp_results}
+    same = all({frozenset(itemset) for itemset, _ in results} == fp_set
+               for results in (tid_results, auto_results))
+
+    print(f"\n=== HOWI-MTO: FP-growth vs Eclat (MinWIO={MinWIO}, min_ws={min_ws}) ===")
+    print(f"{'Metric':<28} {'FP-growth':<15} {'Eclat tids':<15} {'Eclat auto':<15}")
+    print("-" * 73)
+    print(f"{'Time (s)':<28} {fp_time:<15.3f} {tid_time:<15.3f} {auto_time:<15.3f}")
+    print(f"{'Number of Itemsets':<28} {len(fp_results):<15} {len(tid_results):<15} {len(auto_results):<15}")
+    print(f"Same itemsets: {same}")
+
+# Số phép giao + tổng TO mỗi giây trên các cặp mục còn lại sau min_ws:
+# tập Python (set &) như calculate_WIO_WIOUB cũ, mảng tid và bitmap
+def compare_intersections(database, min_ws=0.01, num_pairs=2000):
+    TO = calculate_TO(database)
+    labels, _ = rank_items(calculate_weighted_support(database, TO), min_ws)
+    tid_index = database.tid_index(labels)
+    bitmaps = TidBitmaps(TO)
+    occupancy = TO.tolist()
+
+    rng = np.random.default_rng(0)
+    pairs = rng.choice(labels, size=(num_pairs, 2)).tolist()
+    tid_sets = {item: set(tid_index[item].tolist()) for item in labels.tolist()}
+    tid_bitmaps = {item: bitmaps.from_tids(tid_index[item]) for item in labels.tolist()}
+    density = np.mean([len(tid_index[item]) for item in labels.tolist()]) / len(database)
+
+    def run(intersect):
+        start = time.time()
+        sums = [intersect(a, b) for a, b in pairs]
+        return sums, num_pairs / (time.time() - start)
+
+    set_sums, set_rate = run(lambda a, b: sum(occupancy[t] for t in tid_sets[a] & tid_sets[b]))
+    array_sums, array_rate = run(lambda a, b: TO[intersect_sorted(tid_index[a], tid_index[b])].sum())
+    bitmap_sums, bitmap_rate = run(lambda a, b: bitmaps.weighted_sum(tid_bitmaps[a] & tid_bitmaps[b]))
+    same = np.allclose(set_sums, array_sums) and np.allclose(set_sums, bitmap_sums)
+
+    print(f"\n=== Intersections per second (min_ws={min_ws}, {len(labels)} items, density {density:.4f}) ===")
+    print(f"{'Metric':<28} {'set &':<15} {'tid arrays':<15} {'bitmaps':<15}")
+    print("-" * 73)
+    print(f"{'Intersections/s':<28} {set_rate:<15.0f} {array_rate:<15.0f} {bitmap_rate:<15.0f}")
+    print(f"Same sums: {same}")
+
+# Mảng tid so với diffset ở các ngưỡng chuyển khác nhau (chỉ so mảng tid,
+# không dùng bitmap): thời gian và tổng số phần tử mảng trung gian được lưu
+def compare_diffsets(database, MinWIO, weight_dict, min_ws=0.01, ratios=(None, 0.9, 0.7, 0.5, 0.3)):
+    print(f"\n=== Eclat: tidsets vs diffsets (MinWIO={MinWIO}, min_ws={min_ws}) ===")
+    print(f"{'diffset_ratio':<15} {'Time (s)':<10} {'Itemsets':<10} {'Tid classes':<13} "
+          f"{'Diff classes':<13} {'Stored tids':<13} {'Same':<6}")
+    print("-" * 84)
+    base = None
+    for ratio in ratios:
+        stats = defaultdict(int)
+        start = time.time()
+        results = HOWI_MTO(database, MinWIO, weight_dict, min_ws, dense_threshold=None,
+                           diffset_ratio=ratio, stats=stats)
+        elapsed = time.time() - start
+        itemsets = {frozenset(itemset) for itemset, _ in results}
+        if base is None:
+            base = itemsets
+        stored = stats['tids_elements'] + stats['diff_elements']
+        print(f"{str(ratio):<15} {elapsed:<10.3f} {len(results):<10} {stats['tids_classes']:<13} "
+              f"{stats['diff_classes']:<13} {stored:<13} {str(itemsets == base):<6}")
+
+# Đối chiếu closed/maximal với lọc sau trên toàn bộ HOI: số itemset và thời gian
+def compare_condensed(database, MinWIO, weight_dict, min_ws=0.01):
+    start = time.time()
+    all_results = HOWI_MTO(database, MinWIO, weight_dict, min_ws, output="all")
+    all_time = time.time() - start
+    hoi = {frozenset(itemset) for itemset, _ in all_results}
+
+    # Lọc sau để đối chiếu: bao đóng tính trực tiếp từ các tập tid
+    TO = calculate_TO(database)
+    ws = calculate_weighted_support(database, TO)
+    labels, _ = rank_items(ws, min_ws)
+    tid_sets = {database.codes[i]: set(t.tolist()) for i, t in database.tid_index(labels).items()}
+    def is_closed(itemset):
+        tids = set.intersection(*(tid_sets[i] for i in itemset))
+        return not any(tids <= t for i, t in tid_sets.items() if i not in itemset)
+    expected = {"closed": {x for x in hoi if is_closed(x)},
+                "maximal": {x for x in hoi if not any(x < y for y in hoi if len(y) > len(x))}}
+
+    rows = {}
+    for output in ["closed", "maximal"]:
+        start = time.time()
+        results = HOWI_MTO(database, MinWIO, weight_dict, min_ws, output=output)
+        rows[output] = (results, time.time() - start)
+
+    print(f"\n=== HOI output modes (MinWIO={MinWIO}, min_ws={min_ws}) ===")
+    print(f"{'Metric':<28} {'All':<15} {'Closed':<15} {'Maximal':<15}")
+    print("-" * 73)
+    print(f"{'Number of Itemsets':<28} {len(all_results):<15} {len(rows['closed'][0]):<15} {len(rows['maximal'][0]):<15}")
+    print(f"{'Time (s)':<28} {all_time:<15.3f} {rows['closed'][1]:<15.3f} {rows['maximal'][1]:<15.3f}")
+    same = all({frozenset(x) for x, _ in rows[output][0]} == expected[output] for output in rows)
+    print(f"Same as post-filtering: {same}")
+
+if __name__ == "__main__":
+    transactions_file = "online_retail_transactions.txt"
+    weights_file = "weight_dict.txt"
+
+    weight_dict = load_weight_dict(weights_file)
+    database = load_weighted_database(transactions_file, weight_dict)
+    for min_ws in [0.01, 0.05, 0.1]:
+        compare_intersections(database, min_ws)
+    # MinWIO=1.5 vượt mọi WIO (trọng số <= 1): kết quả rỗng
+    for MinWIO, min_ws in [(0.05, 0.05), (0.02, 0.1), (0.01, 0.1), (1.5, 0.05)]:
+        compare_engines(database, MinWIO, weight_dict, min_ws)
+    compare_diffsets(database, 0.01, weight_dict, 0.1)
+    for MinWIO, min_ws in [(0.05, 0.05), (0.02, 0.1)]:
+        compare_condensed(database, MinWIO, weight_dict, min_ws)
@@ -0,0 +1,250 @@
+from array import array
+from collections import defaultdict
+import time
+import tracemalloc
+
+from item_encoding import EncodedDatabase, encode_transactions
+from main import (FPTree, calculate_TO, calculate_weighted_support, load_weight_dict,
+                  load_weighted_database, rank_items, ranked_transactions)
+
+# Cây FP lưu dạng các mảng song song: mỗi nút là một chỉ số, nút 0 là gốc.
+# Mục trong cây là thứ hạng (rank) theo ws giảm dần, nên một đường đi
+# từ gốc xuống lá luôn có rank tăng dần.
+class FPArrayTree:
+    def __init__(self):
+        self.item = array('i', [-1])
+        self.count = array('d', [0.0])
+        self.parent = array('i', [-1])
+        self.first_child = array('i', [-1])
+        self.next_sibling = array('i', [-1])
+        self.node_link = array('i', [-1])
+        self.header_table = {}  # item -> nút đầu của chuỗi node_link
+        self.item_counts = defaultdict(float)
+        self._link_tail = {}
+
+    def __len__(self):
+        return len(self.item)
+
+    def _new_node(self, item, count, parent):
+        node = len(self.item)
+        self.item.append(item)
+        self.count.append(count)
+        self.parent.append(parent)
+        self.first_child.append(-1)
+        self.next_sibling.append(self.first_child[parent])
+        self.first_child[parent] = node
+        self.node_link.append(-1)
+        tail = self._link_tail.get(item)
+        if tail is None:
+            self.header_table[item] = node
+        else:
+            self.node_link[tail] = node
+        self._link_tail[item] = node
+        return node
+
+    # Chèn các đường đi đã sắp xếp theo thứ tự từ điển: mỗi đường đi chỉ
+    # chung tiền tố với đường đi ngay trước nó nên không cần tìm nút con.
+    def add_paths(self, paths):
+        stack = [0]
+        prev = ()
+        for path, count in paths:
+            depth = 0
+            limit = min(len(path), len(prev))
+            while depth < limit and path[depth] == prev[depth]:
+                depth += 1
+            del stack[depth + 1:]
+            for node in stack[1:]:
+                self.count[node] += count
+            for item in path[depth:]:
+                stack.append(self._new_node(item, count, stack[-1]))
+            for item in path:
+                self.item_counts[item] += count
+            prev = path
+        self._link_tail.clear()
+
+    def nodes(self, item):
+        node = self.header_table.get(item, -1)
+        while node != -1:
+            yield node
+            node = self.node_link[node]
+
+    # Cơ sở mẫu điều kiện của một mục: các đường đi tiền tố kèm count của nút
+    def prefix_paths(self, item):
+        item_arr = self.item
+        parent = self.parent
+        paths = []
+        for node in self.nodes(item):
+            path = []
+            current = parent[node]
+            while current > 0:
+                path.append(item_arr[current])
+                current = parent[current]
+            if path:
+                path.reverse()
+                paths.append((tuple(path), self.count[node]))
+        return paths
+
+    def conditional_tree(self, item):
+        paths = self.prefix_paths(item)
+        paths.sort()
+        cond_tree = FPArrayTree()
+        cond_tree.add_paths(paths)
+        return cond_tree
+
+    def print_tree(self, node=0, level=0, max_nodes=10, labels=None):
+        if max_nodes <= 0:
+            return max_nodes
+        if node != 0:
+            item = self.item[node] if labels is None else labels[self.item[node]]
+            print("  " * level + f"{item}: {self.count[node]:.3f}")
+            max_nodes -= 1
+        child = self.first_child[node]
+        while child != -1 and max_nodes > 0:
+            max_nodes = self.print_tree(child, level + 1, max_nodes, labels)
+            child = self.next_sibling[child]
+        return max_nodes
+
+# Xây dựng cây mảng: trả về cây, bảng rank -> id và trọng số theo rank
+def build_fp_tree(database, TO, min_ws=0.01):
+    ws = calculate_weighted_support(database, TO)
+    labels, rank = rank_items(ws, min_ws)
+    weights = database.weights[labels].tolist()
+    occupancy = TO.tolist()
+
+    tids, paths = ranked_transactions(database, rank)
+    paths = sorted((tuple(path), occupancy[tid]) for tid, path in zip(tids, paths))
+
+    tree = FPArrayTree()
+    tree.add_paths(paths)
+    return tree, labels.tolist(), weights
+
+# Khai thác trực tiếp trên cây mảng. count của nút đã là tổng TO của các
+# giao dịch đi qua nút, nên tổng count của một mục trong cây điều kiện của
+# prefix chính là TO của prefix + [item]; không cần tập tid.
+def fp_growth(fp_tree, TO, weight_dict, MinWIO, prefix=None, HOI=None):
+    if HOI is None:
+        HOI = []
+    if prefix is None:
+        prefix = []
+
+    items = [(item, count) for item, count in fp_tree.item_counts.items()
+             if weight_dict[item] * count >= MinWIO]
+    items.sort(key=lambda x: x[1])
+
+    for item, count in items:
+        new_prefix = prefix + [item]
+        weights = [weight_dict[i] for i in new_prefix]
+        WIO = sum(weights) / len(weights) * count
+        WIOUB = max(weights) * count
+
+        if WIO >= MinWIO and WIOUB >= MinWIO:
+            HOI.append((new_prefix, WIO))
+
+        if WIOUB >= MinWIO:
+            cond_tree = fp_tree.conditional_tree(item)
+            if cond_tree.header_table:
+                fp_growth(cond_tree, TO, weight_dict, MinWIO, new_prefix, HOI)
+
+    return HOI
+
+# Thuật toán HOWI-MTO với cây mảng
+def HOWI_MTO(database, MinWIO, weight_dict, min_ws=0.01):
+    if not isinstance(database, EncodedDatabase):
+        database = encode_transactions(database, weight_dict)
+    TO = calculate_TO(database)
+    fp_tree, labels, weights = build_fp_tree(database, TO, min_ws)
+    results = fp_growth(fp_tree, TO, weights, MinWIO)
+    return [(database.decode([labels[r] for r in itemset]), WIO) for itemset, WIO in results]
+
+# Cùng phép duyệt như fp_growth ở trên nhưng trên cây FPNode của main.py,
+# chỉ dùng để so sánh bộ nhớ và thời gian giữa hai cách lưu cây.
+def _fp_growth_objects(fp_tree, weight_dict, MinWIO, prefix, HOI):
+    items = [(item, count) for item, count in fp_tree.item_counts.items()
+             if weight_dict[item] * count >= MinWIO]
+    items.sort(key=lambda x: x[1])
+
+    for item, count in items:
+        new_prefix = prefix + [item]
+        weights = [weight_dict[i] for i in new_prefix]
+        WIO = sum(weights) / len(weights) * count
+        WIOUB = max(weights) * count
+        if WIO >= MinWIO:
+            HOI.append((new_prefix, WIO))
+
+        if WIOUB >= MinWIO:
+            paths = []
+            for node in fp_tree.header_table[item]:
+                path = []
+                current = node.parent
+                while current.item is not None:
+                    path.append(current.item)
+                    current = current.parent
+                if path:
+                    path.reverse()
+                    paths.append((path, node.count))
+            cond_tree = FPTree()
+            for path, count in paths:
+                cond_tree.add_transaction(path, count)
+            if cond_tree.header_table:
+                _fp_growth_objects(cond_tree, weight_dict, MinWIO, new_prefix, HOI)
+    return HOI
+
+def _measure(func):
+    tracemalloc.start()
+    start = time.time()
+    result = func()
+    elapsed = time.time() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+# So sánh cây FPNode (main.py) với cây mảng trên cùng một phép khai thác
+def compare_trees(database, MinWIO, min_ws=0.01):
+    TO = calculate_TO(database)
+    ws = calculate_weighted_support(database, TO)
+    labels, rank = rank_items(ws, min_ws)
+    labels = labels.tolist()
+    weight_dict = database.weights.tolist()
+    occupancy = TO.tolist()
+    tids, paths = ranked_transactions(database, rank)
+
+    def build_objects():
+        tree = FPTree()
+        for tid, path in zip(tids, paths):
+            tree.add_transaction([labels[r] for r in path], occupancy[tid])
+        return tree
+
+    obj_tree, obj_build_time, obj_build_mem = _measure(build_objects)
+    arr_build, arr_build_time, arr_build_mem = _measure(
+        lambda: build_fp_tree(database, TO, min_ws))
+    arr_tree, _, weights = arr_build
+    obj_nodes = sum(len(nodes) for nodes in obj_tree.header_table.values())
+
+    # Cả hai cây đã dựng sẵn ở trên, phần khai thác chỉ đo fp_growth
+    obj_mine = lambda: _fp_growth_objects(obj_tree, weight_dict, MinWIO, [], [])
+    arr_mine = lambda: fp_growth(arr_tree, TO, weights, MinWIO)
+    obj_hoi, obj_mine_time, obj_mine_mem = _measure(obj_mine)
+    arr_hoi, arr_mine_time, arr_mine_mem = _measure(arr_mine)
+
+    obj_set = {frozenset(itemset) for itemset, _ in obj_hoi}
+    arr_set = {frozenset(labels[r] for r in itemset) for itemset, _ in arr_hoi}
+
+    print(f"\n=== FP-Tree: FPNode objects vs arrays (MinWIO={MinWIO}, min_ws={min_ws}) ===")
+    print(f"{'Metric':<28} {'FPNode':<15} {'Array':<15}")
+    print("-" * 58)
+    print(f"{'Global tree nodes':<28} {obj_nodes:<15} {len(arr_tree) - 1:<15}")
+    print(f"{'Build time (s)':<28} {obj_build_time:<15.3f} {arr_build_time:<15.3f}")
+    print(f"{'Build peak memory (MB)':<28} {obj_build_mem:<15.3f} {arr_build_mem:<15.3f}")
+    print(f"{'Mining time (s)':<28} {obj_mine_time:<15.3f} {arr_mine_time:<15.3f}")
+    print(f"{'Mining peak memory (MB)':<28} {obj_mine_mem:<15.3f} {arr_mine_mem:<15.3f}")
+    print(f"{'Number of Itemsets':<28} {len(obj_hoi):<15} {len(arr_hoi):<15}")
+    print(f"Same itemsets: {obj_set == arr_set}")
+
+if __name__ == "__main__":
+    transactions_file = "online_retail_transactions.txt"
+    weights_file = "weight_dict.txt"
+
+    weight_dict = load_weight_dict(weights_file)
+    database = load_weighted_database(transactions_file, weight_dict)
+    for MinWIO, min_ws in [(0.05, 0.05), (0.02, 0.1)]:
+        compare_trees(database, MinWIO, min_ws)
@@ -0,0 +1,213 @@
+from array import array
+from multiprocessing import Pool, cpu_count, shared_memory
+import pickle
+import time
+
+import fp_array
+from fp_array import FPArrayTree
+from item_encoding import EncodedDatabase, encode_transactions
+from main import calculate_TO, load_weight_dict, load_weighted_database
+
+# Các mảng của cây toàn cục đặt trong shared_memory: item, count, parent,
+# node_link, heads (rank -> nút đầu của chuỗi node_link) và trọng số theo rank.
+# Tiến trình chính ghi một lần, worker gắn vào theo tên mà không sao chép.
+class SharedFPTree:
+    def __init__(self, fp_tree, weights):
+        heads = array('i', [-1]) * len(weights)
+        for item, node in fp_tree.header_table.items():
+            heads[item] = node
+        fields = {'item': fp_tree.item, 'count': fp_tree.count, 'parent': fp_tree.parent,
+                  'node_link': fp_tree.node_link, 'heads': heads, 'weights': array('d', weights)}
+        self.blocks = []
+        self.layout = {}  # tên trường -> (tên khối, typecode, số phần tử)
+        for field, data in fields.items():
+            raw = data.tobytes()
+            shm = shared_memory.SharedMemory(create=True, size=max(1, len(raw)))
+            shm.buf[:len(raw)] = raw
+            self.blocks.append(shm)
+            self.layout[field] = (shm.name, data.typecode, len(data))
+
+    def close(self):
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+
+# Gắn vào các khối theo layout; trả về memoryview đã cast theo kiểu phần tử
+def attach_tree(layout):
+    blocks = []
+    views = {}
+    for field, (name, typecode, length) in layout.items():
+        shm = shared_memory.SharedMemory(name=name)
+        blocks.append(shm)
+        views[field] = shm.buf[:length * array(typecode).itemsize].cast(typecode)
+    return blocks, views
+
+# Chuyển cây FPNode (main.FPTree hay cây đối tượng của các script step5/step6)
+# sang cây mảng: mục của nút là rank theo thứ tự khoá của header_table, chuỗi
+# node_link đi theo đúng thứ tự các danh sách trong header_table nên cơ sở mẫu
+# điều kiện đọc từ cây mảng trùng thứ tự với cây gốc. Trả về cây và các mục theo rank.
+def flatten_tree(fp_tree):
+    items = list(fp_tree.header_table)
+    rank = {item: r for r, item in enumerate(items)}
+    flat = FPArrayTree()
+    index = {}
+    stack = [(child, 0) for child in fp_tree.root.children.values()]
+    while stack:
+        node, parent = stack.pop()
+        index[id(node)] = flat._new_node(rank[node.item], node.count, parent)
+        stack.extend((child, index[id(node)]) for child in node.children.values())
+    flat._link_tail.clear()
+    for item, nodes in fp_tree.header_table.items():
+        flat.header_table[rank[item]] = index[id(nodes[0])]
+        for node, next_node in zip(nodes, nodes[1:]):
+            flat.node_link[index[id(node)]] = index[id(next_node)]
+        flat.node_link[index[id(nodes[-1])]] = -1
+        flat.item_counts[rank[item]] = fp_tree.item_counts[item]
+    return flat, items
+
+# Dữ liệu dùng chung của các worker, nạp một lần qua initializer của Pool
+_worker_data = {}
+
+def init_worker(layout, MinWIO):
+    blocks, views = attach_tree(layout)
+    _worker_data['blocks'] = blocks
+    _worker_data['tree'] = views
+    _worker_data['MinWIO'] = MinWIO
+
+# Cơ sở mẫu điều kiện đọc thẳng từ các mảng dùng chung
+def shared_prefix_paths(tree, item):
+    item_arr = tree['item']
+    parent = tree['parent']
+    count = tree['count']
+    node_link = tree['node_link']
+    paths = []
+    node = tree['heads'][item]
+    while node != -1:
+        path = []
+        current = parent[node]
+        while current > 0:
+            path.append(item_arr[current])
+            current = parent[current]
+        if path:
+            path.reverse()
+            paths.append((tuple(path), count[node]))
+        node = node_link[node]
+    return paths
+
+# Worker khai thác trọn một cây con: task chỉ là rank của mục; cơ sở mẫu
+# điều kiện lấy từ cây dùng chung, cây điều kiện dựng riêng trong worker.
+# Trả về kèm rank để tiến trình chính xếp lại kết quả theo thứ tự tuần tự.
+def mine_subtree(item):
+    tree = _worker_data['tree']
+    paths = shared_prefix_paths(tree, item)
+    paths.sort()
+    cond_tree = FPArrayTree()
+    cond_tree.add_paths(paths)
+    if not cond_tree.header_table:
+        return item, []
+    return item, fp_array.fp_growth(cond_tree, None, tree['weights'], _worker_data['MinWIO'], [item])
+
+# Độ sâu của mọi nút; nút cha luôn được tạo trước nút con
+def node_depths(fp_tree):
+    parent = fp_tree.parent
+    depth = array('i', [0]) * len(parent)
+    for node in range(1, len(parent)):
+        depth[node] = depth[parent[node]] + 1
+    return depth
+
+# Chia việc theo các mục ở mức trên cùng: mỗi task là một mục. Chi phí ước
+# lượng bằng tổng độ dài các đường đi trong cơ sở mẫu điều kiện; task lớn
+# được gửi trước, chunksize=1 để worker rảnh nhận task kế tiếp. HOI nhận các
+# HOI một mục theo đúng thứ tự duyệt của fp_array.fp_growth (count tăng dần).
+def split_tasks(fp_tree, weights, MinWIO, HOI):
+    depth = node_depths(fp_tree)
+    items = [(item, count) for item, count in fp_tree.item_counts.items()
+             if weights[item] * count >= MinWIO]
+    items.sort(key=lambda x: x[1])
+    tasks = []
+    for item, count in items:
+        HOI.append(([item], weights[item] * count))
+        cost = sum(depth[node] - 1 for node in fp_tree.nodes(item))
+        if cost > 0:
+            tasks.append((cost, item))
+    tasks.sort(reverse=True)
+    return [item for _, item in tasks]
+
+# Các cây con về theo thứ tự xong việc; kết quả được ghép lại sau mỗi HOI
+# một mục tương ứng nên trùng thứ tự với bản tuần tự
+def fp_growth_parallel(fp_tree, weights, MinWIO, processes=None):
+    singletons = []
+    tasks = split_tasks(fp_tree, weights, MinWIO, singletons)
+    if processes is None:
+        processes = cpu_count()
+    subtrees = {}
+    shared_tree = SharedFPTree(fp_tree, weights)
+    try:
+        with Pool(processes=processes, initializer=init_worker,
+                  initargs=(shared_tree.layout, MinWIO)) as pool:
+            for item, subtree_HOI in pool.imap_unordered(mine_subtree, tasks, chunksize=1):
+                subtrees[item] = subtree_HOI
+    finally:
+        shared_tree.close()
+
+    HOI = []
+    for itemset, WIO in singletons:
+        HOI.append((itemset, WIO))
+        HOI.extend(subtrees.get(itemset[0], []))
+    return HOI
+
+# Thuật toán HOWI-MTO song song theo cây con
+def HOWI_MTO(database, MinWIO, weight_dict, min_ws=0.01, processes=None):
+    if not isinstance(database, EncodedDatabase):
+        database = encode_transactions(database, weight_dict)
+    TO = calculate_TO(database)
+    fp_tree, labels, weights = fp_array.build_fp_tree(database, TO, min_ws)
+    results = fp_growth_parallel(fp_tree, weights, MinWIO, processes)
+    return [(database.decode([labels[r] for r in itemset]), WIO) for itemset, WIO in results]
+
+# So sánh bản tuần tự (fp_array) với bản song song theo số worker
+def compare_parallel(database, MinWIO, weight_dict, min_ws=0.01):
+    start = time.time()
+    serial = fp_array.HOWI_MTO(database, MinWIO, weight_dict, min_ws)
+    serial_time = time.time() - start
+
+    workers = sorted({1, 2, 4, 8, 16, cpu_count()} & set(range(1, cpu_count() + 1)))
+    print(f"\n=== HOWI-MTO: serial vs subtree-parallel (MinWIO={MinWIO}, min_ws={min_ws}) ===")
+    print(f"{'Workers':<10} {'Time (s)':<12} {'Speedup':<10} {'Itemsets':<10} {'Same':<6}")
+    print("-" * 50)
+    print(f"{'serial':<10} {serial_time:<12.3f} {1.0:<10.2f} {len(serial):<10} {'-':<6}")
+    for processes in workers:
+        start = time.time()
+        results = HOWI_MTO(database, MinWIO, weight_dict, min_ws, processes)
+        elapsed = time.time() - start
+        same = results == serial
+        print(f"{processes:<10} {elapsed:<12.3f} {serial_time / elapsed:<10.2f} {len(results):<10} {str(same):<6}")
+
+# Kích thước dữ liệu gửi qua IPC cho mỗi task: cơ sở mẫu điều kiện (cách
+# cũ) so với chỉ rank của mục khi cây nằm trong shared_memory
+def compare_payload(database, MinWIO, min_ws=0.01):
+    TO = calculate_TO(database)
+    fp_tree, _, weights = fp_array.build_fp_tree(database, TO, min_ws)
+    tasks = split_tasks(fp_tree, weights, MinWIO, [])
+    old_sizes = [len(pickle.dumps((item, fp_tree.prefix_paths(item)))) for item in tasks]
+    new_sizes = [len(pickle.dumps(item)) for item in tasks]
+    # item, parent, node_link (int32) + count (float64) theo nút; heads + weights theo mục
+    shared_size = len(fp_tree) * (4 * 3 + 8) + len(weights) * (4 + 8)
+
+    print(f"\n=== Task payload: pickled pattern bases vs shared tree (MinWIO={MinWIO}, min_ws={min_ws}) ===")
+    print(f"{'Metric':<28} {'Pickled':<15} {'Shared':<15}")
+    print("-" * 58)
+    print(f"{'Tasks':<28} {len(tasks):<15} {len(tasks):<15}")
+    print(f"{'Avg bytes per task':<28} {sum(old_sizes) / len(tasks):<15.1f} {sum(new_sizes) / len(tasks):<15.1f}")
+    print(f"{'Max bytes per task':<28} {max(old_sizes):<15} {max(new_sizes):<15}")
+    print(f"{'Shared blocks (MB)':<28} {'-':<15} {shared_size / 1024 / 1024:<15.3f}")
+
+if __name__ == "__main__":
+    transactions_file = "online_retail_transactions.txt"
+    weights_file = "weight_dict.txt"
+
+    weight_dict = load_weight_dict(weights_file)
+    database = load_weighted_database(transactions_file, weight_dict)
+    for MinWIO, min_ws in [(0.05, 0.05), (0.02, 0.1)]:
+        compare_payload(database, MinWIO, min_ws)
+        compare_parallel(database, MinWIO, weight_dict, min_ws)
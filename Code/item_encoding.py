@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Cơ sở dữ liệu đã mã hoá: mỗi StockCode được gán một id nguyên liên tục,
+# các giao dịch được nối liền trong một mảng id (dạng CSR).
+class EncodedDatabase:
+    def __init__(self, items, offsets, codes, weights):
+        self.items = items      # np.int32, id của mọi giao dịch nối liền nhau
+        self.offsets = offsets  # np.int64, giao dịch tid = items[offsets[tid]:offsets[tid + 1]]
+        self.codes = codes      # id -> StockCode
+        self.weights = weights  # np.float64, trọng số theo id
+        self.ids = {code: i for i, code in enumerate(codes)}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, tid):
+        return self.items[self.offsets[tid]:self.offsets[tid + 1]]
+
+    def __iter__(self):
+        for tid in range(len(self)):
+            yield self[tid]
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    # tid của từng phần tử trong items
+    def occurrence_tids(self):
+        return np.repeat(np.arange(len(self), dtype=np.int32), self.lengths())
+
+    # Chỉ mục ngược: id -> mảng tid tăng dần của các giao dịch chứa mục
+    def tid_index(self, items=None):
+        order = np.argsort(self.items, kind='stable')
+        sorted_ids = self.items[order]
+        sorted_tids = self.occurrence_tids()[order]
+        bounds = np.searchsorted(sorted_ids, np.arange(len(self.codes) + 1))
+        if items is None:
+            items = range(len(self.codes))
+        return {item: sorted_tids[bounds[item]:bounds[item + 1]] for item in items}
+
+    # Danh sách giao dịch dạng list id cho các vòng lặp Python thuần
+    def transactions(self):
+        flat = self.items.tolist()
+        bounds = self.offsets.tolist()
+        return [flat[bounds[tid]:bounds[tid + 1]] for tid in range(len(self))]
+
+    def encode(self, itemset):
+        return [self.ids[code] for code in itemset]
+
+    def decode(self, itemset):
+        return [self.codes[i] for i in itemset]
+
+# Mã hoá từ các giao dịch dạng chuỗi; mục không có trọng số bị bỏ qua,
+# giao dịch rỗng sau khi lọc bị loại như load_weighted_database.
+def encode_transactions(transactions, weight_dict):
+    ids = {}
+    codes = []
+    items = []
+    offsets = [0]
+    for t in transactions:
+        start = len(items)
+        for code in t:
+            if code not in weight_dict:
+                continue
+            i = ids.get(code)
+            if i is None:
+                i = ids[code] = len(codes)
+                codes.append(code)
+            items.append(i)
+        if len(items) > start:
+            offsets.append(len(items))
+    weights = np.array([weight_dict[code] for code in codes], dtype=np.float64)
+    return EncodedDatabase(np.array(items, dtype=np.int32),
+                           np.array(offsets, dtype=np.int64), codes, weights)
+
+# Đọc file giao dịch "T1: item1 item2 ..." và mã hoá ngay khi đọc
+def load_encoded_database(file_path, weight_dict):
+    def parse():
+        with open(file_path, 'r') as f:
+            for line in f:
+                parts = line.strip().split(':')
+                if len(parts) < 2:
+                    continue
+                yield dict.fromkeys(parts[1].strip().split())
+    return encode_transactions(parse(), weight_dict)
+
+# Kho nhị phân dạng CSR đặt cạnh file văn bản: online_retail_transactions.csr/
+def store_path_for(file_path):
+    return os.path.splitext(file_path)[0] + '.csr'
+
+# Dấu vân tay của tập StockCode có trọng số: kho chỉ giữ các mục có trong
+# weight_dict lúc mã hoá, nên đổi tập khoá (không phải giá trị) là kho cũ
+def weight_fingerprint(weight_dict):
+    return hashlib.sha1(json.dumps(sorted(weight_dict)).encode()).hexdigest()
+
+# Ghi một lần: items.npy (int32), offsets.npy (int64), bảng id -> StockCode
+# và header.json (dấu vân tay của weight_dict đã dùng để lọc)
+def save_encoded_database(database, store_path, weight_dict):
+    os.makedirs(store_path, exist_ok=True)
+    np.save(os.path.join(store_path, 'items.npy'), np.asarray(database.items, dtype=np.int32))
+    np.save(os.path.join(store_path, 'offsets.npy'), np.asarray(database.offsets, dtype=np.int64))
+    with open(os.path.join(store_path, 'codes.json'), 'w') as f:
+        json.dump(database.codes, f)
+    with open(os.path.join(store_path, 'header.json'), 'w') as f:
+        json.dump({'weight_fingerprint': weight_fingerprint(weight_dict)}, f)
+
+# Ánh xạ bộ nhớ kho CSR (không sao chép). Trả về None nếu kho chứa mục
+# không có trong weight_dict, khi đó cần đọc lại từ file văn bản.
+def open_encoded_database(store_path, weight_dict):
+    with open(os.path.join(store_path, 'codes.json'), 'r') as f:
+        codes = json.load(f)
+    if any(code not in weight_dict for code in codes):
+        return None
+    items = np.load(os.path.join(store_path, 'items.npy'), mmap_mode='r')
+    offsets = np.load(os.path.join(store_path, 'offsets.npy'), mmap_mode='r')
+    weights = np.array([weight_dict[code] for code in codes], dtype=np.float64)
+    return EncodedDatabase(items, offsets, codes, weights)
+
+# Kho còn dùng được khi mới hơn file văn bản và được lọc bằng cùng tập khoá
+# của weight_dict (kho cũ không có header.json luôn bị coi là cũ)
+def is_store_fresh(store_path, file_path, weight_dict):
+    codes_file = os.path.join(store_path, 'codes.json')
+    header_file = os.path.join(store_path, 'header.json')
+    if not os.path.exists(codes_file) or not os.path.exists(header_file):
+        return False
+    with open(header_file, 'r') as f:
+        if json.load(f).get('weight_fingerprint') != weight_fingerprint(weight_dict):
+            return False
+    return not os.path.exists(file_path) or os.path.getmtime(codes_file) >= os.path.getmtime(file_path)
+
+# Chuyển file giao dịch văn bản sang kho CSR
+def convert_transactions_file(file_path, weight_dict, store_path=None):
+    if store_path is None:
+        store_path = store_path_for(file_path)
+    database = load_encoded_database(file_path, weight_dict)
+    save_encoded_database(database, store_path, weight_dict)
+    return store_path, database
+
+if __name__ == "__main__":
+    transactions_file = "online_retail_transactions.txt"
+    weights_file = "weight_dict.txt"
+
+    with open(weights_file, 'r') as f:
+        weight_dict = json.load(f)
+    store_path, database = convert_transactions_file(transactions_file, weight_dict)
+    print(f"Transactions saved to {store_path}")
+    print(f"Number of transactions: {len(database)}")
+    print(f"Number of item occurrences: {len(database.items)}")
+    print(f"Number of unique items: {len(database.codes)}")
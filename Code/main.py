@@ -1,7 +1,14 @@
+import heapq
 import json
 import time
 
 from collections import defaultdict
+from itertools import count as counter
+
+import numpy as np
+
+from item_encoding import (EncodedDatabase, convert_transactions_file, encode_transactions,
+                           is_store_fresh, open_encoded_database, store_path_for)
 
 class FPNode:
     def __init__(self, item, count, parent):
@@ -11,17 +18,19 @@ class FPNode:
         self.children = {}
         self.node_link = None
 
+# tid_index: item -> mảng tid đã sắp xếp, dựng một lần và dùng chung cho mọi
+# cây điều kiện. tids: các giao dịch thuộc CSDL điều kiện của cây
+# (None với cây gốc, tức toàn bộ CSDL).
 class FPTree:
-    def __init__(self):
+    def __init__(self, tid_index=None, tids=None):
         self.root = FPNode(None, 0, None)
         self.header_table = defaultdict(list)
         self.item_counts = defaultdict(float)
-        self.tid_map = defaultdict(list)
+        self.tid_index = tid_index if tid_index is not None else {}
+        self.tids = tids
 
-    def add_transaction(self, transaction, count, tid):
+    def add_transaction(self, transaction, count):
         current = self.root
-        path = []
-        nodes_in_path = []
         for item in transaction:
             self.item_counts[item] += count
             if item in current.children:
@@ -31,132 +40,396 @@ class FPTree:
                 current.children[item] = new_node
                 self.header_table[item].append(new_node)
             current = current.children[item]
-            path.append(item)
-            nodes_in_path.append(current)
-        self.tid_map[tuple(path)].append((tid, count, nodes_in_path))
+
+    # tid của mục trong CSDL điều kiện của cây
+    def item_tids(self, item):
+        tids = self.tid_index[item]
+        if self.tids is not None:
+            tids = np.intersect1d(tids, self.tids, assume_unique=True)
+        return tids
 
 def calculate_TO(database):
-    total_items = sum(len(t) for t in database)
-    return [len(t) / total_items for t in database]
-
-def calculate_weighted_support(database, TO, weight_dict, min_ws=0.01):
-    ws = defaultdict(float)
-    for tid, t in enumerate(database):
-        for item in t:
-            ws[item] += TO[tid] * weight_dict[item]
-    return {item: w for item, w in ws.items() if w >= min_ws}
-
-def build_fp_tree(database, TO, weight_dict, min_ws=0.01):
-    ws = calculate_weighted_support(database, TO, weight_dict, min_ws)
-    tree = FPTree()
-    for tid, t in enumerate(database):
-        valid_items = [item for item in t if item in ws]
-        if not valid_items:
-            continue
-        sorted_items = sorted(valid_items, key=lambda x: ws[x], reverse=True)
-        tree.add_transaction(sorted_items, TO[tid], tid)
+    lengths = database.lengths()
+    return lengths / lengths.sum()
+
+def calculate_WTO(database):
+    transaction_weights = np.bincount(database.occurrence_tids(),
+                                      weights=database.weights[database.items],
+                                      minlength=len(database))
+    total_weight = transaction_weights.sum()
+    if total_weight == 0:
+        return np.zeros(len(database))
+    return transaction_weights / total_weight
+
+def calculate_weighted_support(database, TO):
+    occupancy = np.bincount(database.items, weights=TO[database.occurrence_tids()],
+                            minlength=len(database.codes))
+    return occupancy * database.weights
+
+# Thứ tự toàn cục của các mục còn lại sau cắt tỉa: ws giảm dần, hoà thì theo id.
+# rank[id] = -1 với mục bị cắt tỉa.
+def rank_items(ws, min_ws=0.01):
+    kept = np.flatnonzero(ws >= min_ws)
+    labels = kept[np.argsort(-ws[kept], kind='stable')]
+    rank = np.full(len(ws), -1, dtype=np.int64)
+    rank[labels] = np.arange(len(labels))
+    return labels, rank
+
+# Các giao dịch dạng list rank tăng dần (bỏ giao dịch rỗng) kèm tid
+def ranked_transactions(database, rank):
+    ranks = rank[database.items]
+    kept = ranks >= 0
+    tids = database.occurrence_tids()[kept]
+    ranks = ranks[kept]
+    order = np.lexsort((ranks, tids))
+    tids, starts = np.unique(tids[order], return_index=True)
+    ranks = ranks[order].tolist()
+    bounds = starts.tolist() + [len(ranks)]
+    return tids.tolist(), [ranks[bounds[i]:bounds[i + 1]] for i in range(len(tids))]
+
+# Ma trận đồng chiếm dụng có trọng số (EUCS của FHM áp cho TO): C[r, s] là
+# tổng TO của các giao dịch chứa cả hai mục rank r và s. Dựng một lần từ dữ
+# liệu CSR theo từng khối giao dịch: C += X^T diag(TO) X với X là ma trận chỉ
+# báo (giao dịch x mục) của khối. Ma trận đối xứng nên chỉ cần nửa trên khi đọc.
+def calculate_co_occupancy(database, TO, rank, num_ranked, block_size=2048):
+    ranks = rank[database.items]
+    kept = ranks >= 0
+    ranks = ranks[kept]
+    tids = database.occurrence_tids()[kept]
+    co_occupancy = np.zeros((num_ranked, num_ranked))
+    for start in range(0, len(database), block_size):
+        stop = min(start + block_size, len(database))
+        lo, hi = np.searchsorted(tids, [start, stop])
+        X = np.zeros((stop - start, num_ranked))
+        X[tids[lo:hi] - start, ranks[lo:hi]] = 1.0
+        co_occupancy += X.T @ (X * TO[start:stop, None])
+    return co_occupancy
+
+# Với mỗi mục i: các mục j còn có thể mở rộng cùng i, tức w(j) * C[i, j] >= MinWIO.
+# TO(prefix + i + j) <= C[i, j] nên mục j bị loại ở đây cũng sẽ bị fp_growth
+# loại khi lọc ứng viên trong cây điều kiện của prefix + i.
+def co_occupancy_partners(co_occupancy, labels, weights, MinWIO):
+    labels = np.asarray(labels)
+    passed = co_occupancy * weights[labels][None, :] >= MinWIO
+    return {item: set(labels[np.flatnonzero(passed[r])].tolist())
+            for r, item in enumerate(labels.tolist())}
+
+def build_fp_tree(database, TO, min_ws=0.01):
+    ws = calculate_weighted_support(database, TO)
+    labels, rank = rank_items(ws, min_ws)
+    labels = labels.tolist()
+    occupancy = TO.tolist()
+    tree = FPTree(database.tid_index(labels))
+    tids, paths = ranked_transactions(database, rank)
+    for tid, path in zip(tids, paths):
+        tree.add_transaction([labels[r] for r in path], occupancy[tid])
     return tree, ws
 
-def calculate_WIO_WIOUB(itemset, fp_tree, TO, weight_dict):
-    tids = None
-    itemset = sorted(itemset, key=lambda x: fp_tree.item_counts[x], reverse=True)
-    for item in itemset:
-        item_tids = set()
-        for node in fp_tree.header_table[item]:
-            for path, tid_list in fp_tree.tid_map.items():
-                for tid, count, nodes in tid_list:
-                    if any(n.item == node.item for n in nodes):  # FIXED
-                        item_tids.add(tid)
-        if tids is None:
-            tids = item_tids
-        else:
-            tids &= item_tids
-
-    WIO = sum(TO[tid] * sum(weight_dict[i] for i in itemset) / len(itemset) for tid in tids) if tids else 0.0
-
-    WIOUB_tids = set()
-    for item in itemset:
-        for node in fp_tree.header_table[item]:
-            for path, tid_list in fp_tree.tid_map.items():
-                for tid, count, nodes in tid_list:
-                    if any(n.item == node.item for n in nodes):  # FIXED
-                        WIOUB_tids.add(tid)
-
-    WIOUB = sum(TO[tid] * max(weight_dict[i] for i in itemset) for tid in WIOUB_tids) if WIOUB_tids else 0.0
+# tids: tập tid của itemset nếu đã có (fp_growth truyền xuống tids(prefix)
+# giao tids(item), chỉ một phép giao). Khi đó tập hợp cho WIOUB cũng chính
+# là tids vì trong cây điều kiện chỉ mục cuối của itemset có trong header.
+def calculate_WIO_WIOUB(itemset, fp_tree, TO, weight_dict, tids=None):
+    if tids is None:
+        tid_lists = sorted((fp_tree.tid_index[item] for item in itemset), key=len)
+        tids = tid_lists[0]
+        for item_tids in tid_lists[1:]:
+            if len(tids) == 0:
+                break
+            tids = np.intersect1d(tids, item_tids, assume_unique=True)
+
+        WIOUB_tids = np.array([], dtype=np.int32)
+        for item in itemset:
+            if item in fp_tree.header_table:
+                WIOUB_tids = np.union1d(WIOUB_tids, fp_tree.item_tids(item))
+    else:
+        WIOUB_tids = tids
+
+    WIO = TO[tids].sum() * sum(weight_dict[i] for i in itemset) / len(itemset) if len(tids) else 0.0
+
+    WIOUB = TO[WIOUB_tids].sum() * max(weight_dict[i] for i in itemset) if len(WIOUB_tids) else 0.0
 
     return WIO, WIOUB, tids
 
-def estimate_WIOUB(item, fp_tree, TO, weight_dict):
-    WIOUB_tids = set()
+def estimate_WIOUB(item, fp_tree, TO, weight_dict, tids=None):
+    WIOUB_tids = fp_tree.item_tids(item) if tids is None else tids
+    return TO[WIOUB_tids].sum() * weight_dict[item] if len(WIOUB_tids) else 0.0
+
+# Cơ sở mẫu điều kiện của item: đường đi từ gốc tới cha của mỗi nút item
+# (theo thứ tự toàn cục) kèm count của nút; nút ngay dưới gốc cho đường đi rỗng
+def prefix_paths(fp_tree, item):
+    paths = []
     for node in fp_tree.header_table[item]:
-        for path, tid_list in fp_tree.tid_map.items():
-            for tid, count, nodes in tid_list:
-                if any(n.item == node.item for n in nodes):  # FIXED
-                    WIOUB_tids.add(tid)
-    return sum(TO[tid] * weight_dict[item] for tid in WIOUB_tids) if WIOUB_tids else 0.0
+        path = []
+        current = node.parent
+        while current is not None and current.item is not None:
+            path.append(current.item)
+            current = current.parent
+        path.reverse()
+        paths.append((path, node.count))
+    return paths
 
-def fp_growth(fp_tree, TO, weight_dict, MinWIO, prefix=None, HOI=None):
-    if HOI is None:
-        HOI = []
-    if prefix is None:
-        prefix = []
+# Cận trên hợp lệ của WIO cho itemset và mọi tập mở rộng của nó trong cây
+# điều kiện. Với mỗi nút của mục cuối, các giao dịch đi qua nút chỉ có thể
+# thêm các mục trên đường đi của nó; trung bình trọng số lớn nhất đạt được
+# là thêm lần lượt các mục nặng nhất còn làm tăng trung bình. Cận là tổng
+# count(nút) * trung bình tốt nhất đó, giống cận remaining-utility của
+# khai thác tập hữu ích cao.
+def remaining_weight_bound(itemset, cond_pattern_base, weight_dict):
+    base_sum = sum(weight_dict[i] for i in itemset)
+    base_len = len(itemset)
+    bound = 0.0
+    for path, count in cond_pattern_base:
+        total, size = base_sum, base_len
+        for w in sorted((weight_dict[i] for i in path), reverse=True):
+            if w * size <= total:
+                break
+            total += w
+            size += 1
+        bound += count * total / size
+    return bound
 
+# bound="wioub": cắt tỉa theo WIOUB (mặc định, cùng kết quả với các engine khác).
+# bound="remaining": cắt tỉa theo remaining_weight_bound, không bỏ sót tập
+# nào có WIO >= MinWIO (xem check_bound.py). stats (nếu có) đếm số ứng viên
+# được xét, bị cắt tỉa (max_weight_pruned: phần bị cắt ngay bởi cận trọng
+# số lớn nhất) và số cây điều kiện được dựng. partners (từ co_occupancy_partners,
+# chỉ dùng với bound="wioub") bỏ khỏi cây điều kiện của item các mục không
+# thể vượt MinWIO cùng item; kết quả không đổi.
+# Các nhánh con của cây: (item, tids(prefix + item), cơ sở mẫu điều kiện hoặc
+# None, cận của nhánh) cho các item qua bước lọc, theo count tăng dần. Cận là
+# WIOUB (bound="wioub") hoặc remaining_weight_bound (bound="remaining").
+def branch_candidates(fp_tree, TO, weight_dict, MinWIO, prefix, bound="wioub", stats=None):
+    # tids(prefix + item) = tids(prefix) giao tids(item): tính một lần ở đây
+    # rồi dùng lại cho WIO/WIOUB và làm tids của cây điều kiện
     items = []
-    for item in fp_tree.header_table:
-        WIOUB = estimate_WIOUB(item, fp_tree, TO, weight_dict)
-        if WIOUB >= MinWIO:
-            items.append((item, WIOUB))
+    if bound == "remaining":
+        # Tiền lọc rẻ: tập mở rộng chỉ gồm mục của prefix và của cây này
+        max_weight = max([weight_dict[i] for i in prefix] + [weight_dict[i] for i in fp_tree.header_table])
+        for item in fp_tree.header_table:
+            item_tids = fp_tree.item_tids(item)
+            if max_weight * TO[item_tids].sum() < MinWIO:
+                if stats is not None:
+                    stats['max_weight_pruned'] += 1
+                continue
+            cond_pattern_base = prefix_paths(fp_tree, item)
+            branch_bound = remaining_weight_bound(prefix + [item], cond_pattern_base, weight_dict)
+            if branch_bound >= MinWIO:
+                items.append((item, item_tids, cond_pattern_base, branch_bound))
+    else:
+        for item in fp_tree.header_table:
+            item_tids = fp_tree.item_tids(item)
+            WIOUB = estimate_WIOUB(item, fp_tree, TO, weight_dict, item_tids)
+            if WIOUB >= MinWIO:
+                items.append((item, item_tids, None, WIOUB))
+
+    if stats is not None:
+        stats['candidates'] += len(fp_tree.header_table)
+        stats['pruned'] += len(fp_tree.header_table) - len(items)
 
     items.sort(key=lambda x: fp_tree.item_counts[x[0]])
+    return items
 
-    for item, _ in items:
-        new_prefix = prefix + [item]
-        WIO, WIOUB, tids = calculate_WIO_WIOUB(new_prefix, fp_tree, TO, weight_dict)
-        if WIO >= MinWIO and WIOUB >= MinWIO:
-            HOI.append((new_prefix, WIO))
+# Xử lý một nhánh: trả về (prefix + item, WIO nếu là HOI hoặc None, cây điều
+# kiện cần khai thác tiếp hoặc None)
+def expand_branch(fp_tree, TO, weight_dict, MinWIO, prefix, item, item_tids, cond_pattern_base,
+                  bound="wioub", stats=None, partners=None):
+    new_prefix = prefix + [item]
+    WIO, WIOUB, tids = calculate_WIO_WIOUB(new_prefix, fp_tree, TO, weight_dict, item_tids)
+    if bound == "remaining":
+        found = WIO if WIO >= MinWIO else None
+    else:
+        found = WIO if WIO >= MinWIO and WIOUB >= MinWIO else None
+        if WIOUB < MinWIO:
+            return new_prefix, found, None
+        cond_pattern_base = prefix_paths(fp_tree, item)
 
-        if WIOUB >= MinWIO:
-            cond_pattern_base = []
-            for node in fp_tree.header_table[item]:
-                path = []
-                current = node
-                while current.parent and current.parent.item is not None:
-                    path.append(current.parent.item)
-                    current = current.parent
-                if path:
-                    cond_pattern_base.append((path, node.count))
-
-            cond_tree = FPTree()
-            for path, count in cond_pattern_base:
-                sorted_path = sorted(path, key=lambda x: fp_tree.item_counts[x], reverse=True)
-                cond_tree.add_transaction(sorted_path, count, -1)
-
-            if cond_tree.header_table:
-                fp_growth(cond_tree, TO, weight_dict, MinWIO, new_prefix, HOI)
+    if partners is not None:
+        item_partners = partners[item]
+        cond_pattern_base = [([i for i in path if i in item_partners], count)
+                             for path, count in cond_pattern_base]
 
+    cond_tree = FPTree(fp_tree.tid_index, tids)
+    for path, count in cond_pattern_base:
+        if path:
+            cond_tree.add_transaction(path, count)
+
+    if not cond_tree.header_table:
+        return new_prefix, found, None
+    if stats is not None:
+        stats['expanded'] += 1
+    return new_prefix, found, cond_tree
+
+# Bản generator: trả về từng (itemset, WIO) ngay khi được xác nhận, theo đúng
+# thứ tự của danh sách HOI cũ. Người gọi có thể dừng sớm (vd. islice) mà
+# phần cây chưa duyệt không bị khai thác.
+def iter_fp_growth(fp_tree, TO, weight_dict, MinWIO, prefix=None, bound="wioub", stats=None,
+                   partners=None):
+    if prefix is None:
+        prefix = []
+    for item, item_tids, cond_pattern_base, _ in branch_candidates(fp_tree, TO, weight_dict, MinWIO,
+                                                                    prefix, bound, stats):
+        new_prefix, WIO, cond_tree = expand_branch(fp_tree, TO, weight_dict, MinWIO, prefix, item,
+                                                   item_tids, cond_pattern_base, bound, stats, partners)
+        if WIO is not None:
+            yield new_prefix, WIO
+        if cond_tree is not None:
+            yield from iter_fp_growth(cond_tree, TO, weight_dict, MinWIO, new_prefix, bound, stats,
+                                      partners)
+
+def fp_growth(fp_tree, TO, weight_dict, MinWIO, prefix=None, HOI=None, bound="wioub", stats=None,
+              partners=None):
+    if HOI is None:
+        HOI = []
+    HOI.extend(iter_fp_growth(fp_tree, TO, weight_dict, MinWIO, prefix, bound, stats, partners))
     return HOI
 
-def HOWI_MTO(database, MinWIO, weight_dict, min_ws=0.01):
-    TO = calculate_TO(database)
-    fp_tree, ws = build_fp_tree(database, TO, weight_dict, min_ws)
-    return fp_growth(fp_tree, TO, weight_dict, MinWIO)
+# Khai thác best-first có ngân sách: mọi nhánh chờ nằm trong một max-heap theo
+# cận của nhánh, nhánh có cận lớn nhất được xử lý trước. Giữa hai nhánh, dừng khi hết
+# time_budget (giây) hoặc khi RSS tăng quá memory_budget (MB) so với lúc bắt
+# đầu (đo mỗi MEMORY_CHECK_INTERVAL nhánh). Khi chạy hết, tập HOI giống hệt
+# fp_growth (chỉ khác thứ tự). report nhận: complete, stopped_by, elapsed,
+# peak_memory, explored, unexplored và unexplored_bounds (prefix + item, cận)
+# theo cận giảm dần. Với bound="remaining" cận là hợp lệ: mọi HOI còn thiếu
+# đều có WIO <= max_unexplored_bound; với bound="wioub" đó chỉ là ước lượng.
+MEMORY_CHECK_INTERVAL = 64
+
+def budgeted_fp_growth(fp_tree, TO, weight_dict, MinWIO, bound="wioub", stats=None, partners=None,
+                       time_budget=None, memory_budget=None, report=None):
+    start = time.time()
+    if memory_budget is not None:
+        import psutil
+        process = psutil.Process()
+        start_rss = process.memory_info().rss / 1024 / 1024
+    peak_memory = 0.0
+
+    frontier = []  # (-cận, seq, cây, prefix, item, tids, cơ sở mẫu điều kiện)
+    seq = counter()
+
+    def push_branches(tree, prefix):
+        for item, item_tids, cond_pattern_base, branch_bound in branch_candidates(
+                tree, TO, weight_dict, MinWIO, prefix, bound, stats):
+            heapq.heappush(frontier, (-branch_bound, next(seq), tree, prefix, item, item_tids,
+                                      cond_pattern_base))
+
+    HOI = []
+    explored = 0
+    stopped_by = None
+    push_branches(fp_tree, [])
+    while frontier:
+        if time_budget is not None and time.time() - start >= time_budget:
+            stopped_by = "time"
+            break
+        if memory_budget is not None and explored % MEMORY_CHECK_INTERVAL == 0:
+            peak_memory = max(peak_memory, process.memory_info().rss / 1024 / 1024 - start_rss)
+            if peak_memory >= memory_budget:
+                stopped_by = "memory"
+                break
+
+        _, _, tree, prefix, item, item_tids, cond_pattern_base = heapq.heappop(frontier)
+        explored += 1
+        new_prefix, WIO, cond_tree = expand_branch(tree, TO, weight_dict, MinWIO, prefix, item, item_tids,
+                                                   cond_pattern_base, bound, stats, partners)
+        if WIO is not None:
+            HOI.append((new_prefix, WIO))
+        if cond_tree is not None:
+            push_branches(cond_tree, new_prefix)
+
+    if report is not None:
+        unexplored = sorted(((entry[3] + [entry[4]], float(-entry[0])) for entry in frontier),
+                            key=lambda x: x[1], reverse=True)
+        report.update({'complete': not frontier, 'stopped_by': stopped_by,
+                       'elapsed': time.time() - start, 'peak_memory': peak_memory,
+                       'explored': explored, 'unexplored': len(unexplored),
+                       'max_unexplored_bound': unexplored[0][1] if unexplored else 0.0,
+                       'unexplored_bounds': unexplored})
+    return HOI
+
+# Toàn bộ pipeline chạy trên id nguyên, chỉ giải mã về StockCode ở kết quả.
+# engine="fp" dùng FP-growth ở trên, engine="eclat" dùng eclat.py (theo chiều dọc).
+# bound và eucs chỉ dùng cho engine="fp" (mặc định "wioub" và True), xem
+# fp_growth; eucs=True cắt tỉa theo ma trận đồng chiếm dụng (chỉ với
+# bound="wioub"). Truyền bound/eucs cùng engine="eclat" gây ValueError;
+# stats được chuyển sang eclat.HOWI_MTO.
+# output="closed"/"maximal" chỉ có ở engine="eclat", xem eclat.eclat_condensed.
+# time_budget/memory_budget/report (chỉ engine="fp") chuyển sang khai thác
+# best-first có ngân sách, xem budgeted_fp_growth; itemset trong report được giải mã.
+# TO (chỉ engine="fp") thay cho calculate_TO(database) khi database chỉ là một
+# phần của CSDL lớn hơn, vd. một phân vùng đã bỏ bớt mục trong son.py.
+def HOWI_MTO(database, MinWIO, weight_dict, min_ws=0.01, engine="fp", bound=None, stats=None,
+             eucs=None, output="all", time_budget=None, memory_budget=None, report=None, TO=None):
+    budgeted = time_budget is not None or memory_budget is not None or report is not None
+    if engine == "eclat":
+        if budgeted:
+            raise ValueError("Time and memory budgets require engine='fp'")
+        if bound is not None or eucs is not None:
+            raise ValueError("bound and eucs require engine='fp'")
+        if TO is not None:
+            raise ValueError("A precomputed TO requires engine='fp'")
+        import eclat
+        return eclat.HOWI_MTO(database, MinWIO, weight_dict, min_ws, stats=stats, output=output)
+    if engine != "fp":
+        raise ValueError(f"Unknown engine '{engine}'")
+    if output != "all":
+        raise ValueError(f"Output mode '{output}' requires engine='eclat'")
+    if bound is None:
+        bound = "wioub"
+    if eucs is None:
+        eucs = True
+    if not budgeted:
+        return list(iter_HOWI_MTO(database, MinWIO, weight_dict, min_ws, bound, stats, eucs, TO))
+
+    # time_budget tính cả thời gian dựng cây
+    start = time.time()
+    if not isinstance(database, EncodedDatabase):
+        database = encode_transactions(database, weight_dict)
+    if TO is None:
+        TO = calculate_TO(database)
+    fp_tree, partners = prepare_fp_tree(database, TO, MinWIO, min_ws, bound, eucs)
+    if time_budget is not None:
+        time_budget = max(time_budget - (time.time() - start), 0.0)
+    results = budgeted_fp_growth(fp_tree, TO, database.weights.tolist(), MinWIO, bound, stats, partners,
+                                 time_budget, memory_budget, report)
+    if report is not None:
+        report['unexplored_bounds'] = [(database.decode(itemset), branch_bound)
+                                       for itemset, branch_bound in report['unexplored_bounds']]
+    return [(database.decode(itemset), WIO) for itemset, WIO in results]
+
+# Cây FP toàn cục và partners (nếu dùng cắt tỉa đồng chiếm dụng)
+def prepare_fp_tree(database, TO, MinWIO, min_ws, bound, eucs):
+    fp_tree, ws = build_fp_tree(database, TO, min_ws)
+    partners = None
+    if eucs and bound == "wioub":
+        labels, rank = rank_items(ws, min_ws)
+        co_occupancy = calculate_co_occupancy(database, TO, rank, len(labels))
+        partners = co_occupancy_partners(co_occupancy, labels, database.weights, MinWIO)
+    return fp_tree, partners
+
+# Như HOWI_MTO (engine="fp") nhưng trả về từng (itemset, WIO) đã giải mã ngay
+# khi tìm thấy, không giữ danh sách kết quả; ghép với các bộ tiêu thụ trong stream.py.
+def iter_HOWI_MTO(database, MinWIO, weight_dict, min_ws=0.01, bound="wioub", stats=None, eucs=True, TO=None):
+    if not isinstance(database, EncodedDatabase):
+        database = encode_transactions(database, weight_dict)
+    if TO is None:
+        TO = calculate_TO(database)
+    fp_tree, partners = prepare_fp_tree(database, TO, MinWIO, min_ws, bound, eucs)
+    for itemset, WIO in iter_fp_growth(fp_tree, TO, database.weights.tolist(), MinWIO, bound=bound,
+                                       stats=stats, partners=partners):
+        yield database.decode(itemset), WIO
 
 
 def load_weight_dict(file_path):
     with open(file_path, 'r') as f:
         return json.load(f)
 
+# Ưu tiên kho CSR (ánh xạ bộ nhớ) nếu đã được tạo từ file văn bản này với
+# cùng weight_dict; nếu không, mã hoá lại từ file văn bản và ghi đè kho
 def load_weighted_database(file_path, weight_dict):
-    database = []
-    with open(file_path, 'r') as f:
-        for line in f:
-            parts = line.strip().split(':')
-            if len(parts) < 2:
-                continue
-            items = parts[1].strip().split()
-            valid_items = [item for item in items if item in weight_dict]
-            if valid_items:
-                database.append(set(valid_items))
+    store_path = store_path_for(file_path)
+    if is_store_fresh(store_path, file_path, weight_dict):
+        database = open_encoded_database(store_path, weight_dict)
+        if database is not None:
+            return database
+    store_path, database = convert_transactions_file(file_path, weight_dict, store_path)
     return database
 
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 import pandas as pd
 import json
 
+from item_encoding import convert_transactions_file
+
 def preprocess_online_retail(input_file, old_weight_dict_file, output_transactions_file, max_transactions=10000, min_item_freq=5):
     # Đọc file Excel
     df = pd.read_excel(input_file)
@@ -45,6 +47,10 @@ def preprocess_online_retail(input_file, old_weight_dict_file, output_transactio
     print(f"Number of unique items in transactions: {len(set(item for line in open(output_transactions_file) for item in line.strip().split(':')[1].split() if ':' in line))}")
     print(f"Sample transactions: {[line.strip() for line in open(output_transactions_file).readlines()[:5]]}")
 
+    # Ghi kho CSR để load_weighted_database ánh xạ bộ nhớ thay vì đọc lại file
+    store_path, _ = convert_transactions_file(output_transactions_file, weight_dict)
+    print(f"CSR store saved to {store_path}")
+
 if __name__ == "__main__":
     input_file = "Online Retail.xlsx"
     old_weight_dict_file = "weight_dict.txt"  # File weight_dict.txt từ bước 1
@@ -0,0 +1,163 @@
+from multiprocessing import Pool, cpu_count
+import time
+
+import numpy as np
+
+from item_encoding import EncodedDatabase
+from main import (HOWI_MTO, calculate_TO, calculate_weighted_support, load_weight_dict,
+                  load_weighted_database, rank_items)
+from sparse_counting import ItemMatrix
+
+# Khai thác HOWI-MTO theo phân vùng (SON), hai pha:
+# - pha 1: chia CSDL thành N đoạn, đoạn p gồm các giao dịch tid % N == p; mỗi
+#   tiến trình khai thác đoạn của mình với TO toàn cục và ngưỡng MinWIO * s_p,
+#   s_p là phần TO của đoạn p (tổng TO toàn cục của các giao dịch trong đoạn);
+# - pha 2: kiểm tra hợp các ứng viên cục bộ trên toàn bộ CSDL bằng ItemMatrix.
+# WIO(X) = tổng theo p của WIO_p(X), WIO_p tính trên đoạn p; nếu mọi đoạn đều
+# có WIO_p(X) < MinWIO * s_p thì WIO(X) < MinWIO vì tổng các s_p là 1. Vậy mọi
+# HOI toàn cục là HOI cục bộ của ít nhất một đoạn và kết quả là chính xác.
+# Mỗi đoạn được khai thác với bound="remaining" (WIOUB không phải cận hợp lệ
+# nên không bảo đảm tìm đủ HOI cục bộ); kết quả trùng với
+# main.HOWI_MTO(..., bound="remaining").
+# Chia theo tid % N thay vì các khoảng tid liên tiếp: hoá đơn xếp theo thời
+# gian nên một khoảng liên tiếp có thể lệch hẳn (vài hoá đơn rất dài dồn vào
+# nửa đầu) và sinh hàng chục nghìn ứng viên cục bộ; chia xen kẽ giữ mỗi đoạn
+# gần giống toàn bộ CSDL.
+
+# Sai số tương đối cho ngưỡng cục bộ để làm tròn số thực không làm mất ứng viên
+LOCAL_SLACK = 1e-9
+# Giá trị gợi ý cho min_partition_size của HOWI_MTO_son: đoạn nhỏ có ngưỡng
+# cục bộ thấp và sinh rất nhiều ứng viên giả (4 đoạn trên 10k hoá đơn đã cho
+# khoảng 47k ứng viên so với 1.4k HOI)
+MIN_PARTITION_SIZE = 5000
+
+# Các giao dịch tids (theo thứ tự) chỉ giữ các mục có keep[id]; độ dài gốc
+# của giao dịch không còn trong đoạn nên TO phải được truyền riêng cho HOWI_MTO
+def partition_database(database, tids, keep):
+    lengths = database.lengths()[tids]
+    offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    positions = np.repeat(database.offsets[tids] - offsets[:-1], lengths) + np.arange(offsets[-1])
+    items = database.items[positions]
+    present = keep[items]
+    rows = np.repeat(np.arange(len(tids)), lengths)
+    lengths = np.bincount(rows[present], minlength=len(tids))
+    offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    return EncodedDatabase(items[present], offsets, database.codes, database.weights)
+
+# Dữ liệu dùng chung của các worker, nạp một lần qua initializer của Pool.
+# Worker tự mở CSDL theo đường dẫn (file .csr được mmap) thay vì nhận qua IPC.
+_worker_data = {}
+
+def init_worker(transactions_file, weight_dict, labels):
+    database = load_weighted_database(transactions_file, weight_dict)
+    keep = np.zeros(len(database.codes), dtype=bool)
+    keep[labels] = True
+    _worker_data['database'] = database
+    _worker_data['TO'] = calculate_TO(database)
+    _worker_data['keep'] = keep
+    _worker_data['weight_dict'] = weight_dict
+
+# Pha 1 cho đoạn p trong N đoạn: các itemset (StockCode) có WIO cục bộ >= local_MinWIO
+def mine_partition(p, num_partitions, local_MinWIO):
+    database = _worker_data['database']
+    tids = np.arange(p, len(database), num_partitions)
+    partition = partition_database(database, tids, _worker_data['keep'])
+    results = HOWI_MTO(partition, local_MinWIO, _worker_data['weight_dict'], 0.0,
+                       bound="remaining", TO=_worker_data['TO'][tids])
+    return [tuple(itemset) for itemset, _ in results]
+
+# Pha 2: WIO của mọi ứng viên trên toàn bộ CSDL, mỗi kích thước một lần
+# ItemMatrix.evaluate (ứng viên sắp theo cột để các tiền tố nằm liền nhau)
+def verify_candidates(database, candidates, labels, TO, MinWIO):
+    matrix = ItemMatrix.from_encoded(database, labels, TO)
+    by_size = {}
+    for itemset in candidates:
+        columns = sorted(matrix.column[item] for item in database.encode(itemset))
+        by_size.setdefault(len(columns), []).append(columns)
+
+    results = []
+    for k in sorted(by_size):
+        group = sorted(by_size[k])
+        itemsets = [[matrix.items[j] for j in columns] for columns in group]
+        occupancy, _ = matrix.evaluate(itemsets, upper=False)
+        WIO = matrix.weights[np.array(group)].mean(axis=1) * occupancy
+        for itemset, value in zip(itemsets, WIO.tolist()):
+            if value >= MinWIO:
+                results.append((database.decode(itemset), value))
+    return results
+
+# Thuật toán HOWI-MTO song song theo phân vùng; mặc định mỗi worker một đoạn.
+# min_partition_size (tuỳ chọn, vd. MIN_PARTITION_SIZE) giới hạn số đoạn để
+# mỗi đoạn có ít nhất chừng ấy giao dịch: ít worker hơn nhưng ít ứng viên giả
+# hơn ở pha 2, nên dùng khi CSDL nhỏ so với số lõi. stats (dict, tuỳ chọn)
+# nhận số đoạn, số ứng viên cục bộ của từng đoạn, số ứng viên sau hợp và
+# thời gian của hai pha
+def HOWI_MTO_son(transactions_file, MinWIO, weight_dict, min_ws=0.01, num_partitions=None,
+                 processes=None, min_partition_size=None, stats=None):
+    if processes is None:
+        processes = cpu_count()
+    database = load_weighted_database(transactions_file, weight_dict)
+    if num_partitions is None:
+        num_partitions = processes
+    if min_partition_size is not None:
+        num_partitions = min(num_partitions, len(database) // min_partition_size)
+    TO = calculate_TO(database)
+    labels, _ = rank_items(calculate_weighted_support(database, TO), min_ws)
+    num_partitions = max(1, min(num_partitions, len(database)))
+    tasks = [(p, num_partitions, MinWIO * TO[p::num_partitions].sum() * (1 - LOCAL_SLACK))
+             for p in range(num_partitions)]
+
+    start = time.time()
+    with Pool(processes=min(processes, len(tasks)), initializer=init_worker,
+              initargs=(transactions_file, weight_dict, labels)) as pool:
+        local_results = pool.starmap(mine_partition, tasks, chunksize=1)
+    mine_time = time.time() - start
+
+    start = time.time()
+    candidates = {frozenset(itemset) for itemsets in local_results for itemset in itemsets}
+    results = verify_candidates(database, candidates, labels.tolist(), TO, MinWIO)
+    verify_time = time.time() - start
+
+    if stats is not None:
+        stats['partitions'] = len(tasks)
+        stats['local_candidates'] = [len(itemsets) for itemsets in local_results]
+        stats['candidates'] = len(candidates)
+        stats['mine_time'] = mine_time
+        stats['verify_time'] = verify_time
+    return results
+
+# So sánh bản tuần tự (main, bound="remaining") với SON theo số đoạn/worker
+def compare_son(transactions_file, MinWIO, weight_dict, min_ws=0.01):
+    database = load_weighted_database(transactions_file, weight_dict)
+    start = time.time()
+    serial = HOWI_MTO(database, MinWIO, weight_dict, min_ws, bound="remaining")
+    serial_time = time.time() - start
+    serial_set = {frozenset(itemset) for itemset, _ in serial}
+
+    # Trên 10k hoá đơn, từ 4 đoạn trở lên số ứng viên giả tăng vọt (xem MIN_PARTITION_SIZE)
+    partitions = sorted({1, 2, max(1, len(database) // MIN_PARTITION_SIZE)})
+    print(f"\n=== HOWI-MTO: serial vs SON partitioned (MinWIO={MinWIO}, min_ws={min_ws}, "
+          f"{cpu_count()} cores) ===")
+    print(f"{'Partitions':<12} {'Local cands':<13} {'Candidates':<12} {'Mine (s)':<10} "
+          f"{'Verify (s)':<12} {'Speedup':<10} {'Itemsets':<10} {'Same':<6}")
+    print("-" * 91)
+    print(f"{'serial':<12} {'-':<13} {'-':<12} {serial_time:<10.3f} {'-':<12} {1.0:<10.2f} "
+          f"{len(serial):<10} {'-':<6}")
+    for num_partitions in partitions:
+        stats = {}
+        start = time.time()
+        results = HOWI_MTO_son(transactions_file, MinWIO, weight_dict, min_ws, num_partitions,
+                               stats=stats)
+        elapsed = time.time() - start
+        same = {frozenset(itemset) for itemset, _ in results} == serial_set
+        print(f"{stats['partitions']:<12} {sum(stats['local_candidates']):<13} {stats['candidates']:<12} "
+              f"{stats['mine_time']:<10.3f} {stats['verify_time']:<12.3f} {serial_time / elapsed:<10.2f} "
+              f"{len(results):<10} {str(same):<6}")
+
+if __name__ == "__main__":
+    transactions_file = "online_retail_transactions.txt"
+    weights_file = "weight_dict.txt"
+
+    weight_dict = load_weight_dict(weights_file)
+    for MinWIO, min_ws in [(0.05, 0.05), (0.02, 0.1)]:
+        compare_son(transactions_file, MinWIO, weight_dict, min_ws)
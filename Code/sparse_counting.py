@@ -0,0 +1,120 @@
+import numpy as np
+from scipy.sparse import csc_matrix
+
+# CSDL dạng ma trận thưa giao dịch × mục (CSC, giá trị 1.0) cùng TO của từng
+# giao dịch, dùng để tính occupancy của cả một mức ứng viên Apriori bằng vài
+# phép tính vector hoá thay vì một vòng Python cho mỗi ứng viên.
+# weights: trọng số của từng mục (None = 1 cho mọi mục, khi đó cận trên chính
+# là IOUB của HOIMTO).
+class ItemMatrix:
+    def __init__(self, database, items, TO, weights=None):
+        items = list(items)
+        column = {item: j for j, item in enumerate(items)}
+        rows, cols = [], []
+        for tid, t in enumerate(database):
+            for item in t:
+                j = column.get(item)
+                if j is not None:
+                    rows.append(tid)
+                    cols.append(j)
+        if weights is not None:
+            weights = [weights[item] for item in items]
+        self.setup(items, rows, cols, len(database), TO, weights)
+
+    # Dựng thẳng từ các mảng CSR của EncodedDatabase (items là id), không lặp
+    # Python theo giao dịch; trọng số lấy từ database.weights
+    @classmethod
+    def from_encoded(cls, database, items, TO):
+        items = np.asarray(items, dtype=np.int64)
+        column = np.full(len(database.codes), -1, dtype=np.int64)
+        column[items] = np.arange(len(items))
+        cols = column[database.items]
+        present = cols >= 0
+        matrix = cls.__new__(cls)
+        matrix.setup(items.tolist(), database.occurrence_tids()[present], cols[present],
+                     len(database), TO, database.weights[items])
+        return matrix
+
+    def setup(self, items, rows, cols, num_transactions, TO, weights):
+        self.items = items
+        self.column = {item: j for j, item in enumerate(self.items)}
+        shape = (num_transactions, len(self.items))
+        self.X = csc_matrix((np.ones(len(rows)), (rows, cols)), shape=shape)
+        self.X_rows = self.X.tocsr()
+        self.TO = np.asarray(TO, dtype=float)
+        if weights is None:
+            self.weights = np.ones(len(self.items))
+        else:
+            self.weights = np.asarray(weights, dtype=float)
+        self.occupancy = self.X.T @ self.TO
+        self.pairs = None
+
+    # Occupancy của mọi 2-itemset trong một phép nhân thưa Xᵀ·diag(TO)·X
+    def pair_occupancy(self):
+        if self.pairs is None:
+            self.pairs = (self.X.T @ self.X.multiply(self.TO[:, None])).tocsr()
+        return self.pairs
+
+    # Trả về (occupancy, cận trên) của từng itemset (cùng kích thước k). Cận
+    # trên là tổng TO * trọng số lớn nhất của các mục có mặt, trên hợp tập
+    # giao dịch của các mục (WIOUB; IOUB khi weights=None); upper=False bỏ qua
+    # cận trên (trả về None) khi chỉ cần occupancy, vd. pha kiểm tra của son.py.
+    def evaluate(self, itemsets, upper=True):
+        if not itemsets:
+            return np.zeros(0), np.zeros(0) if upper else None
+        idx = np.array([[self.column[item] for item in itemset] for itemset in itemsets])
+        k = idx.shape[1]
+        w = self.weights
+        if k == 1:
+            occupancy = self.occupancy[idx[:, 0]]
+            return occupancy, occupancy * w[idx[:, 0]] if upper else None
+        if k == 2:
+            a, b = idx[:, 0], idx[:, 1]
+            occupancy = np.asarray(self.pair_occupancy()[a, b]).ravel()
+            if not upper:
+                return occupancy, None
+            # Giao dịch chứa cả hai chỉ được tính với trọng số lớn hơn
+            upper = (w[a] * self.occupancy[a] + w[b] * self.occupancy[b]
+                     - np.minimum(w[a], w[b]) * occupancy)
+            return occupancy, upper
+
+        # k >= 3: ứng viên cùng (k-1)-tiền tố nằm liền nhau (cách join_candidates
+        # sinh ra), mỗi nhóm tính bằng một lát cắt ma trận
+        occupancy = np.zeros(len(itemsets))
+        bounds = np.zeros(len(itemsets)) if upper else None
+        start = 0
+        while start < len(idx):
+            end = start + 1
+            while end < len(idx) and (idx[end, :-1] == idx[start, :-1]).all():
+                end += 1
+            prefix, lasts = idx[start, :-1], idx[start:end, -1]
+            occupancy[start:end], group_bounds = self.extend_prefix(prefix, lasts, upper)
+            if upper:
+                bounds[start:end] = group_bounds
+            start = end
+        return occupancy, bounds
+
+    # Occupancy và cận trên của prefix + [b] cho mọi b trong lasts:
+    # - occupancy: AND các cột của prefix cho tập giao dịch, rồi một phép nhân
+    #   TO[rows] với các cột lasts trên đúng các dòng đó;
+    # - cận trên: U[t] là trọng số lớn nhất của prefix có trong t, thêm b chỉ
+    #   cộng TO[t] * max(0, w(b) - U[t]) trên các giao dịch chứa b.
+    def extend_prefix(self, prefix, lasts, upper=True):
+        X, TO, w = self.X, self.TO, self.weights
+        rows = X.indices[X.indptr[prefix[0]]:X.indptr[prefix[0] + 1]]
+        U = np.zeros(X.shape[0]) if upper else None
+        for j in prefix:
+            column_rows = X.indices[X.indptr[j]:X.indptr[j + 1]]
+            if j != prefix[0]:
+                rows = np.intersect1d(rows, column_rows, assume_unique=True)
+            if upper:
+                U[column_rows] = np.maximum(U[column_rows], w[j])
+        occupancy = self.X_rows[rows][:, lasts].T @ TO[rows]
+        if not upper:
+            return occupancy, None
+
+        columns = X[:, lasts]
+        counts = np.diff(columns.indptr)
+        gain = TO[columns.indices] * np.maximum(0.0, np.repeat(w[lasts], counts) - U[columns.indices])
+        extra = np.bincount(np.repeat(np.arange(len(lasts)), counts), weights=gain, minlength=len(lasts))
+        return occupancy, TO @ U + extra
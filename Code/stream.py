@@ -0,0 +1,110 @@
+from collections import defaultdict, deque
+import heapq
+from itertools import count as counter, islice
+import time
+
+from main import HOWI_MTO, iter_HOWI_MTO, load_weight_dict, load_weighted_database
+
+# Các bộ tiêu thụ cho luồng (itemset, WIO) của iter_HOWI_MTO. Mỗi bộ là một
+# bước trung chuyển: nhận luồng, ghi nhận từng phần tử rồi chuyển tiếp, nên
+# có thể xếp chồng bằng pipe() và chỉ giữ O(n) phần tử cho top-n / head-n.
+
+# Đếm số itemset đi qua
+class CountItemsets:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, stream):
+        for item in stream:
+            self.count += 1
+            yield item
+
+# Giữ n itemset đầu tiên (như results[:n] của danh sách cũ)
+class HeadItemsets:
+    def __init__(self, n):
+        self.n = n
+        self.itemsets = []
+
+    def __call__(self, stream):
+        for item in stream:
+            if len(self.itemsets) < self.n:
+                self.itemsets.append(item)
+            yield item
+
+# Giữ n itemset có WIO lớn nhất bằng min-heap kích thước n
+class TopWIO:
+    def __init__(self, n):
+        self.n = n
+        self.heap = []  # (WIO, seq, itemset)
+        self.seq = counter()
+
+    def __call__(self, stream):
+        for itemset, WIO in stream:
+            if len(self.heap) < self.n:
+                heapq.heappush(self.heap, (WIO, next(self.seq), itemset))
+            elif WIO > self.heap[0][0]:
+                heapq.heappushpop(self.heap, (WIO, next(self.seq), itemset))
+            yield itemset, WIO
+
+    def itemsets(self):
+        return [(itemset, WIO) for WIO, _, itemset in sorted(self.heap, reverse=True)]
+
+# Ghi mỗi itemset thành một dòng "mục1 mục2 ...\tWIO" vào file đã mở
+class WriteItemsets:
+    def __init__(self, file):
+        self.file = file
+
+    def __call__(self, stream):
+        for itemset, WIO in stream:
+            self.file.write(f"{' '.join(map(str, itemset))}\t{WIO:.6f}\n")
+            yield itemset, WIO
+
+# Nối các bước lên luồng theo thứ tự; limit dừng luồng sau limit itemset
+# đầu tiên (phần cây còn lại không bị khai thác)
+def pipe(stream, *stages, limit=None):
+    if limit is not None:
+        stream = islice(stream, limit)
+    for stage in stages:
+        stream = stage(stream)
+    return stream
+
+# Chạy hết luồng mà không giữ phần tử nào
+def drain(stream):
+    deque(stream, maxlen=0)
+
+# So sánh danh sách đầy đủ với luồng + bộ tiêu thụ, và dừng sớm sau 10 itemset
+def compare_streaming(database, MinWIO, weight_dict, min_ws=0.01):
+    start = time.time()
+    results = HOWI_MTO(database, MinWIO, weight_dict, min_ws)
+    list_time = time.time() - start
+
+    counts, head, top = CountItemsets(), HeadItemsets(5), TopWIO(5)
+    stream_stats = defaultdict(int)
+    start = time.time()
+    drain(pipe(iter_HOWI_MTO(database, MinWIO, weight_dict, min_ws, stats=stream_stats), counts, head, top))
+    stream_time = time.time() - start
+
+    first, early_stats = CountItemsets(), defaultdict(int)
+    start = time.time()
+    drain(pipe(iter_HOWI_MTO(database, MinWIO, weight_dict, min_ws, stats=early_stats), first, limit=10))
+    early_time = time.time() - start
+
+    expected_top = sorted(results, key=lambda x: x[1], reverse=True)[:5]
+    print(f"\n=== HOWI-MTO: list vs streaming (MinWIO={MinWIO}, min_ws={min_ws}) ===")
+    print(f"{'Metric':<28} {'List':<15} {'Stream':<15} {'First 10':<15}")
+    print("-" * 73)
+    print(f"{'Itemsets consumed':<28} {len(results):<15} {counts.count:<15} {first.count:<15}")
+    print(f"{'Itemsets held':<28} {len(results):<15} {len(head.itemsets) + len(top.heap):<15} {0:<15}")
+    print(f"{'Conditional trees built':<28} {'-':<15} {stream_stats['expanded']:<15} {early_stats['expanded']:<15}")
+    print(f"{'Time (s)':<28} {list_time:<15.3f} {stream_time:<15.3f} {early_time:<15.3f}")
+    print(f"Same first 5: {head.itemsets == results[:5]}, "
+          f"same top-5 WIO: {[w for _, w in top.itemsets()] == [w for _, w in expected_top]}")
+
+if __name__ == "__main__":
+    transactions_file = "online_retail_transactions.txt"
+    weights_file = "weight_dict.txt"
+
+    weight_dict = load_weight_dict(weights_file)
+    database = load_weighted_database(transactions_file, weight_dict)
+    for MinWIO, min_ws in [(0.05, 0.05), (0.02, 0.1), (0.01, 0.1)]:
+        compare_streaming(database, MinWIO, weight_dict, min_ws)
@@ -0,0 +1,118 @@
+import heapq
+from itertools import count as counter
+import random
+import time
+
+from check_bound import brute_force_WIO, make_synthetic
+from eclat import intersect_sorted
+from item_encoding import EncodedDatabase, encode_transactions
+from main import (calculate_TO, calculate_weighted_support, load_weight_dict,
+                  load_weighted_database, rank_items)
+
+# Khai thác k itemset có WIO lớn nhất, không cần chọn MinWIO trước.
+# Duyệt theo chiều dọc như eclat.py: lớp của itemset Y là các mục k có thể
+# thêm vào (rank nhỏ hơn mục cuối của Y) kèm tids(Y + k) và TO(Y + k). Mọi
+# tập được sinh dưới Y + k có dạng Y + k + Z với Z lấy trong phần lớp đứng
+# trước k, nên WIO của chúng <= max(mean(Y), trọng số lớn nhất của lớp tới k)
+# * TO(Y + k). Cận này hợp lệ (không như WIOUB) nên top-k là chính xác.
+# Các cây con được lấy ra theo cận giảm dần (best-first); ngưỡng là WIO nhỏ
+# nhất trong heap top-k khi heap đã đủ k phần tử và dừng khi cận lớn nhất
+# còn lại nhỏ hơn ngưỡng.
+def HOWI_MTO_topk(database, k, weight_dict, min_ws=0.0, stats=None):
+    if not isinstance(database, EncodedDatabase):
+        database = encode_transactions(database, weight_dict)
+    TO = calculate_TO(database)
+    ws = calculate_weighted_support(database, TO)
+    labels, _ = rank_items(ws, min_ws)
+    weights = database.weights.tolist()
+    tid_index = database.tid_index(labels)
+
+    top = []  # min-heap (WIO, seq, itemset)
+    frontier = []  # max-heap theo cận: (-bound, seq, itemset, tids, TO, lớp cha, vị trí trong lớp)
+    seq = counter()
+
+    def threshold():
+        return top[0][0] if len(top) == k else 0.0
+
+    # Đẩy các cây con Y + k của lớp vào frontier
+    def push_class(itemset, mean, candidates):
+        max_weight = 0.0
+        for idx, (item, tids, occupancy) in enumerate(candidates):
+            max_weight = max(max_weight, weights[item])
+            bound = max(mean, max_weight) * occupancy
+            if bound >= threshold():
+                heapq.heappush(frontier, (-bound, next(seq), itemset + [item], tids, occupancy, candidates, idx))
+
+    root = [(item, tid_index[item], TO[tid_index[item]].sum()) for item in labels.tolist()]
+    push_class([], 0.0, root)
+
+    while frontier:
+        neg_bound, _, itemset, tids, occupancy, candidates, idx = heapq.heappop(frontier)
+        if -neg_bound < threshold():
+            break
+        if stats is not None:
+            stats['expanded'] += 1
+
+        mean = sum(weights[i] for i in itemset) / len(itemset)
+        WIO = mean * occupancy
+        if len(top) < k:
+            heapq.heappush(top, (WIO, next(seq), itemset))
+        elif WIO > top[0][0]:
+            heapq.heappushpop(top, (WIO, next(seq), itemset))
+
+        # Lớp của itemset; mục m bị bỏ nếu mọi tập chứa itemset + m đều dưới
+        # ngưỡng: WIO <= max(mean(itemset + m), trọng số lớn nhất của lớp) * TO(itemset + m)
+        class_max = max((weights[item] for item, _, _ in candidates[:idx]), default=0.0)
+        new_candidates = []
+        for item, item_tids, _ in candidates[:idx]:
+            new_tids = intersect_sorted(tids, item_tids)
+            if len(new_tids) == 0:
+                continue
+            new_occupancy = TO[new_tids].sum()
+            new_mean = (mean * len(itemset) + weights[item]) / (len(itemset) + 1)
+            if max(new_mean, class_max) * new_occupancy >= threshold():
+                new_candidates.append((item, new_tids, new_occupancy))
+        if new_candidates:
+            push_class(itemset, mean, new_candidates)
+
+    results = sorted(top, reverse=True)
+    return [(database.decode(itemset), WIO) for WIO, _, itemset in results]
+
+# Đối chiếu với vét cạn trên các CSDL tổng hợp nhỏ: WIO của top-k phải trùng
+# với k giá trị WIO lớn nhất (itemset có thể khác khi WIO bằng nhau)
+def check_topk(num_databases=200, seed=0):
+    rng = random.Random(seed)
+    failures = 0
+    for _ in range(num_databases):
+        database, weight_dict = make_synthetic(rng, rng.randint(4, 11), rng.randint(5, 40), rng.randint(2, 7))
+        values = brute_force_WIO(database, weight_dict, 0.0)
+        k = rng.randint(1, 20)
+        expected = sorted(values.values(), reverse=True)[:k]
+        results = HOWI_MTO_topk(database, k, weight_dict)
+        found = [WIO for _, WIO in results]
+        exact = all(abs(values[frozenset(itemset)] - WIO) < 1e-9 for itemset, WIO in results)
+        if len(found) != len(expected) or not exact or any(abs(a - b) > 1e-9 for a, b in zip(found, expected)):
+            failures += 1
+            print(f"Mismatch: k={k}, expected={expected}, found={found}")
+    print(f"\n=== Top-k brute-force check on {num_databases} synthetic databases ===")
+    print(f"Databases with a wrong top-k: {failures}")
+    return failures == 0
+
+if __name__ == "__main__":
+    check_topk()
+
+    transactions_file = "online_retail_transactions.txt"
+    weights_file = "weight_dict.txt"
+
+    weight_dict = load_weight_dict(weights_file)
+    database = load_weighted_database(transactions_file, weight_dict)
+    # Thay cho việc dò tay MinWIO=0.082 / min_ws=0.084 để được 50–60 itemset
+    for k in [10, 50, 100]:
+        stats = {'expanded': 0}
+        start = time.time()
+        results = HOWI_MTO_topk(database, k, weight_dict, stats=stats)
+        elapsed = time.time() - start
+        print(f"\nTop-{k}: {len(results)} itemsets in {elapsed:.3f} seconds, "
+              f"{stats['expanded']} nodes expanded, k-th WIO = {results[-1][1]:.4f}")
+        for itemset, WIO in results[:5]:
+            print(f"Itemset: {itemset}, WIO: {WIO:.3f}")